@@ -4,6 +4,9 @@ from datetime import datetime, timedelta
 from igitur import GaudeamSession, GaudeamCalendar
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# number of requests made in parallel across all events, lower this to put less load on gaudeam
+MAX_WORKERS = 8
+
 session = GaudeamSession.with_user_auth("your@email.de", "yourpassword")
 
 calendar = GaudeamCalendar(session)
@@ -17,9 +20,4 @@ events = calendar.global_calendar(past, today)
 
 # download all media files for each event into a folder named with the event date and title with subfolders for each uploader
 base_path = Path("./downloaded_events/")
-for event in events:
-    date_str = event.get_start_datetime().strftime("%Y-%m-%d")
-    folder_name = f"{date_str} {event.get_title()}"
-    logging.info(f"Downloading media for event '{event.get_title()}' into folder '{folder_name}'")
-    event_path = base_path / folder_name
-    event.download_media(event_path)
+calendar.download_events_media(events, base_path, max_workers=MAX_WORKERS)
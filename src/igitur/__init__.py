@@ -1,7 +1,25 @@
-from .calendar import GaudeamCalendar, GaudeamEvent
-from .session import GaudeamSession
-from .members import GaudeamMembers
-from .drive import GaudeamDriveFolder, GaudeamDrive, GaudeamDriveFile, GaudeamResizedImageUploader
+import importlib
+import typing
+
+# submodules are imported on first access (PEP 562) so that importing igitur, 
+# e.g. for the cli, does not load requests and Pillow up front
+_LAZY_IMPORTS = {
+    "GaudeamCalendar": ".calendar",
+    "GaudeamEvent": ".calendar",
+    "GaudeamSession": ".session",
+    "GaudeamMembers": ".members",
+    "GaudeamDriveFolder": ".drive",
+    "GaudeamDrive": ".drive",
+    "GaudeamDriveFile": ".drive",
+    "GaudeamResizedImageUploader": ".drive",
+}
+
+if typing.TYPE_CHECKING:
+    from .calendar import GaudeamCalendar, GaudeamEvent
+    from .session import GaudeamSession
+    from .members import GaudeamMembers
+    from .drive import GaudeamDriveFolder, GaudeamDrive, GaudeamDriveFile, GaudeamResizedImageUploader
+
 __all__ = ["GaudeamCalendar",
             "GaudeamMembers",
             "GaudeamSession", 
@@ -11,3 +29,12 @@ __all__ = ["GaudeamCalendar",
             "GaudeamResizedImageUploader",
             "GaudeamEvent"
             ]
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,8 +1,12 @@
 from __future__ import annotations
 import logging
 import datetime
+import email.utils
+import functools
 import typing
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
+from .core import conditional_request_headers, response_json, write_response_to_file
 from .session import GaudeamSession
     
 
@@ -14,10 +18,12 @@ class GaudeamCalendar:
         self._session = gaudeam_session
 
     @staticmethod
+    @functools.lru_cache(maxsize=4096)
     def date_string_to_datetime(date: str) -> datetime.datetime:
         """Gives a date time object back for dates in the following formats: 
             2025-11-02T14:23:45.123456Z
             Sun, 02 Nov 2025 14:23:45 +0000
+        Results are cached, many events share the same start string. 
         Args:
             date (str): The date string
 
@@ -25,12 +31,26 @@ class GaudeamCalendar:
             datetime.datetime: The parsed datetime
         """
         if date[-1] == "Z":
-            dt = datetime.datetime.strptime(date, "%Y-%m-%dT%H:%M:%S.%fZ")
-            dt = dt.replace(tzinfo=datetime.timezone.utc)
+            # fromisoformat is much faster than strptime, python < 3.11 does not know the Z suffix
+            try:
+                dt = datetime.datetime.fromisoformat(date[:-1] + "+00:00")
+            except ValueError:
+                # python < 3.11 only accepts 3 or 6 fractional digits
+                dt = datetime.datetime.strptime(date, "%Y-%m-%dT%H:%M:%S.%fZ")
+                dt = dt.replace(tzinfo=datetime.timezone.utc)
         else:
-            dt = datetime.datetime.strptime(date, "%a, %d %b %Y %H:%M:%S %z")
+            # RFC 2822 date, parsed without the locale dependent %a and %b of strptime
+            dt = email.utils.parsedate_to_datetime(date)
+            if dt.tzinfo is None:
+                # "-0000" means UTC without a known local zone, parsedate_to_datetime returns it naive
+                dt = dt.replace(tzinfo=datetime.timezone.utc)
         return dt.astimezone(datetime.timezone.utc)
 
+    @staticmethod
+    def _query_date(date: datetime.date) -> str:
+        # midnight UTC of the day, the first 10 characters of isoformat() are YYYY-MM-DD for dates and datetimes
+        return f"{date.isoformat()[:10]}T00:00:00Z"
+
     def user_calendar(self, start_date: datetime.date, end_date: datetime.date) -> list[dict]:
         """Returns the custom user calendar for the currently logged in user. 
 
@@ -41,35 +61,38 @@ class GaudeamCalendar:
         Returns:
             list[dict]: The list of events in this time
         """
-        start_str = start_date.strftime("%Y-%m-%dT00:00:00Z")
-        end_str = end_date.strftime("%Y-%m-%dT00:00:00Z")
+        start_str = self._query_date(start_date)
+        end_str = self._query_date(end_date)
         url = f"{self._session.url()}/user_calendar.json?start={start_str}&end={end_str}&timeZone=UTC"
         response = self._session.client().get(url)
         if response.status_code == 200:
-            events = response.json()
-            events = sorted(events, key=lambda x: self.date_string_to_datetime(x["start"]))
+            events = response_json(response)
+            # key= parses each start date once, the sort compares the parsed datetimes
+            events.sort(key=lambda x: self.date_string_to_datetime(x["start"]))
             return events
         else:
             raise RuntimeError(f"Error fetching calendar: {response.status_code}, {response.text}")
 
     def global_calendar(self, start_date: datetime.date, end_date: datetime.date) -> list[GaudeamEvent]:
         """Returns events from the global calendar of the instance. 
+        The events are created from the calendar response, so title, start date and url 
+        are available without an extra request per event. 
 
         Args:
             start_date (datetime.date): The start time from which to collect events
             end_date (datetime.date): The end time till which to collect events
 
         Returns:
-            list[dict]: List of events
+            list[GaudeamEvent]: List of events
         """
-        start_str = start_date.strftime("%Y-%m-%dT00:00:00Z")
-        end_str = end_date.strftime("%Y-%m-%dT00:00:00Z")
+        start_str = self._query_date(start_date)
+        end_str = self._query_date(end_date)
         url = f"{self._session.url()}/global_calendar.json?start={start_str}&end={end_str}&timeZone=UTC"
         response = self._session.client().get(url)
         if response.status_code != 200:
             raise RuntimeError(f"Error fetching calendar: {response.status_code}, {response.text}")
 
-        all_events = response.json()
+        all_events = response_json(response)
         events = []
         for event_data in all_events:
             if "personal_records" in event_data["url"]: # skip, it's a birthday
@@ -77,10 +100,57 @@ class GaudeamCalendar:
             else: # normal events
                 event_id = event_data["id"]
                 events.append(GaudeamEvent(self._session, event_id, event_data))
-        events = sorted(events, key=lambda x: self.date_string_to_datetime(x._properties["start"]))
+        # key= parses each start date once, the sort compares the parsed datetimes
+        events.sort(key=GaudeamEvent.get_start_datetime)
 
         return events
 
+    def download_events_media(self, events: list[GaudeamEvent], base_path: Path|str, max_workers: int = 8) -> bool:
+        """Downloads the media of several events in parallel. 
+        Each event is downloaded into a sub folder named with its date and title, 
+        e.g. "2025-11-02 Stiftungsfest". The requests of all events share one pool of workers, 
+        so max_workers limits the number of requests in flight in total. 
+
+        Args:
+            events (list[GaudeamEvent]): The events to download the media from
+            base_path (Path | str): The folder in which the event folders are created
+            max_workers (int, optional): Number of requests made in parallel. Defaults to 8.
+
+        Returns:
+            bool: True if the media of all events was downloaded
+        """
+        base_path = Path(base_path)
+        success = True
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            posts_futures = {}
+            for event in events:
+                title = event.get_title()
+                date_str = event.get_start_datetime().date().isoformat()
+                folder_path = base_path / f"{date_str} {title}"
+                logging.info(f"Downloading media for event '{title}' into folder '{folder_path.name}'")
+                posts_futures[executor.submit(event.get_posts)] = folder_path
+
+            media_list_futures = {}
+            for posts_future in as_completed(posts_futures):
+                folder_path = posts_futures[posts_future]
+                try:
+                    posts = posts_future.result()
+                except Exception as e:
+                    logging.error(f"Failed to download media into folder '{folder_path.name}': {e}")
+                    success = False
+                    continue
+                for post in posts:
+                    media_list_futures[executor.submit(post.get_media)] = (post, folder_path)
+
+            futures = GaudeamEvent._submit_media_downloads(executor, media_list_futures)
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.error(f"Failed to download media into folder '{futures[future].name}': {e}")
+                    success = False
+        return success
+
 class GaudeamEvent():
     def __init__(self, session: GaudeamSession, event_id: str, properties: dict = None):
         self._session = session
@@ -89,14 +159,16 @@ class GaudeamEvent():
             self._properties = self._get_properties()
         else:
             self._properties = properties
+        # parsed on first use, the calendar sorts by it and the folder names use it again
+        self._start_datetime: datetime.datetime|None = None
 
     def _get_properties(self) -> dict:
         url = f"{self._session.url()}/api/v1/events/{self._event_id}"
-        response = self._session.client().get(url)
-        if response.status_code == 200:
-            return response.json()
+        status_code, data = self._session.cached_get_json(url)
+        if status_code == 200:
+            return data
         else:
-            raise RuntimeError(f"Error fetching event properties for event '{self._event_id}': {response.status_code}, {response.text}")
+            raise RuntimeError(f"Error fetching event properties for event '{self._event_id}': {status_code}, {data}")
 
     def get_title(self) -> str:
         return self._properties["title"]
@@ -107,33 +179,80 @@ class GaudeamEvent():
     def get_event_url(self) -> str:
         return self._properties["url"]
     
-    def download_media(self, folder_path: Path|str):
+    def download_media(self, folder_path: Path|str, max_workers: int = 8):
+        """Downloads the media of all posts of the event, one sub folder per post creator. 
+        Files that already exist are skipped, the others are downloaded in parallel. 
+
+        Args:
+            folder_path (Path | str): The folder to download the media to
+            max_workers (int, optional): Number of media downloaded in parallel. Defaults to 8.
+        """
         folder_path = Path(folder_path)
-        for post in self.get_posts():
+        posts = self.get_posts()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # the media lists of all posts are requested at once instead of one post after the other
+            media_list_futures = {executor.submit(post.get_media): (post, folder_path) for post in posts}
+            futures = self._submit_media_downloads(executor, media_list_futures)
+            for future in as_completed(futures):
+                # raises the error of a failed download
+                future.result()
+
+    @staticmethod
+    def _submit_media_downloads(executor: Executor, 
+                                media_list_futures: dict[Future, tuple[EventPost, Path]]) -> dict[Future, Path]:
+        """Submits the downloads of the media of posts, one sub folder per post creator. 
+        Downloads start as soon as the media list of their post is there, in the order the lists arrive. 
+        Files that already exist are skipped. 
+
+        Args:
+            executor (Executor): The executor to download in
+            media_list_futures (dict[Future, tuple[EventPost, Path]]): Futures of post.get_media 
+                                    with the post and the folder of its event
+
+        Returns:
+            dict[Future, Path]: The download futures with the folder of their event, 
+                                    failed media list requests are included with their error
+        """
+        futures = {}
+        # creator folders that were already created, each is created once
+        created_folders = set()
+        # files are only created when their download finishes, so media with the same name, 
+        # e.g. of two posts by one creator, are caught by the paths claimed so far
+        claimed_files = set()
+        for media_list_future in as_completed(media_list_futures):
+            post, folder_path = media_list_futures[media_list_future]
+            if media_list_future.exception() is not None:
+                futures[media_list_future] = folder_path
+                continue
             creator_name = post.get_creator_name()
+            sub_folder = folder_path / creator_name
 
-            for media in post.get_media():
-                sub_folder = folder_path / creator_name
-                if not sub_folder.exists():
-                    sub_folder.mkdir(parents=True)
+            for media in media_list_future.result():
+                if sub_folder not in created_folders:
+                    sub_folder.mkdir(parents=True, exist_ok=True)
+                    created_folders.add(sub_folder)
                 file_name = media.get_download_name()
 
                 save_path = sub_folder / file_name
-                if save_path.exists():
+                if save_path in claimed_files or save_path.exists():
                     logging.info(f"Skipping {save_path}: File already exists")
                     continue
+                claimed_files.add(save_path)
                 logging.info(f"Downloading media '{file_name}' from post by '{creator_name}' to '{save_path}'")
-                media.download(save_path)
+                futures[executor.submit(media.download, save_path)] = folder_path
+        return futures
 
     def get_start_datetime(self) -> datetime.datetime:
-        return GaudeamCalendar.date_string_to_datetime(self._properties["start"])
+        if self._start_datetime is None:
+            self._start_datetime = GaudeamCalendar.date_string_to_datetime(self._properties["start"])
+        return self._start_datetime
 
     def get_posts(self) -> typing.List[EventPost]:
         url = f"{self._session.url()}/api/v1/events/{self._event_id}/posts"
-        response = self._session.client().get(url)
-        if response.status_code == 200:
+        status_code, data = self._session.cached_get_json(url)
+        if status_code == 200:
             post_list = []
-            for post_data in response.json():
+            for post_data in data:
                 post_id = post_data["id"]
                 post = EventPost(self._session, self._event_id, post_id, post_data)
                 post_list.append(post)
@@ -154,11 +273,11 @@ class EventPost():
 
     def _get_properties(self) -> dict:
         url = f"{self._session.url()}/api/v1/events/{self._event_id}/posts/{self._post_id}"
-        response = self._session.client().get(url)
-        if response.status_code == 200:
-            return response.json()
+        status_code, data = self._session.cached_get_json(url)
+        if status_code == 200:
+            return data
         else:
-            raise RuntimeError(f"Error fetching post properties for post '{self._post_id}': {response.status_code}, {response.text}")
+            raise RuntimeError(f"Error fetching post properties for post '{self._post_id}': {status_code}, {data}")
 
     def get_creator_name(self) -> str:
         return self._properties["creator"]["full_name"]
@@ -166,17 +285,18 @@ class EventPost():
     def get_media(self) -> GaudeamMedia:
         #/api/v1/posts/post_id/event_media
         url = f"{self._session.url()}/api/v1/posts/{self._post_id}/event_media"
-        response = self._session.client().get(url)
-        if response.status_code == 200:
+        status_code, data = self._session.cached_get_json(url)
+        if status_code == 200:
             media_list = []
-            for media_data in response.json():
+            for media_data in data:
                 media_id = media_data["id"]
                 media_list.append(GaudeamMedia(self._session, media_id, media_data))
             return media_list
         else:
-            raise ValueError(f"Could not get media for post_id '{self._post_id}': {response.status_code}, {response.text}")
+            raise ValueError(f"Could not get media for post_id '{self._post_id}': {status_code}, {data}")
 
 class GaudeamMedia():
+
     def __init__(self, session: GaudeamSession, media_id: str, properties: dict):
         self._session = session
         self._media_id = media_id
@@ -189,7 +309,9 @@ class GaudeamMedia():
         return self._properties["uploaded_file"]["file_name"]
 
     def download(self, file_path: str|Path) -> bool:
-        """Downloads a file to a local path
+        """Downloads a file to a local path. 
+        If the file already exists locally, the server is asked to only send it if it 
+        was modified since, an unchanged file is not transferred again. 
 
         Args:
             file_path (str | Path): The path to save the file to
@@ -202,14 +324,16 @@ class GaudeamMedia():
         #url = f"{self._session.url()}/drive/uploaded_files/{file_id}/download"
         
         url = self._properties["uploaded_file"]["original"]["url"]
-        response = self._session.client().get(url)
-        if response.status_code != 200:
-            raise RuntimeError(f"Could not download media '{self._media_id}' on {url}")
-        # TODO: error handling
-
-        # Save as binary file
-        with open(file_path, "wb") as f:
-            f.write(response.content)
+        headers = conditional_request_headers(file_path)
+        with self._session.client().get(url, headers=headers, stream=True) as response:
+            if response.status_code == 304:
+                logging.info(f"Skipping '{file_path}' - not modified")
+                return True
+            if response.status_code != 200:
+                raise RuntimeError(f"Could not download media '{self._media_id}' on {url}")
+
+            # Save as binary file, chunk by chunk to keep memory usage constant
+            write_response_to_file(response, file_path)
         return True
 
 
@@ -1,19 +1,27 @@
-import argcomplete
+from __future__ import annotations
 import argparse
+import functools
 import logging
+import os
+import typing
 from datetime import datetime, timedelta
 from getpass import getpass
-from igitur import GaudeamSession
 from pathlib import Path
 import sys
 logging.basicConfig(level=logging.INFO)
-from .core import IgiturError
-from .drive import GaudeamDriveFolder, GaudeamResizedImageUploader
-from .calendar import GaudeamEvent, GaudeamCalendar
+from .core import IgiturError, IgiturAuthenticationError
+
+# the library modules pull in requests and Pillow, they are imported 
+# in the commands that need them to keep commands like logout fast
+if typing.TYPE_CHECKING:
+    from .session import GaudeamSession
 
 SESSION_PATH = Path.home() / ".igitur_session"
+# default number of simultaneous transfers of the commands
+DEFAULT_PARALLEL = 8
 
 def login(email: str, password: str) -> GaudeamSession:
+    from .session import GaudeamSession
 
     session = GaudeamSession.with_user_auth(email, password)
 
@@ -23,6 +31,23 @@ def login(email: str, password: str) -> GaudeamSession:
     print(f"Logged in, Session saved to {file_path}")
     return 0
 
+def existing_session(email: str) -> GaudeamSession | None:
+    """Returns the stored session if it is still valid and belongs to the given email"""
+    from .session import GaudeamSession
+    if not SESSION_PATH.exists():
+        return None
+    try:
+        # get_user_email fails for an expired session, so it doubles as the validity check
+        session = GaudeamSession.from_file(SESSION_PATH, validate=False)
+        if session.get_user_email().lower() != email.lower():
+            return None
+    except Exception as e:
+        # a broken or unreadable session file or a network error must not stop the login, 
+        # which is the command to repair the session
+        logging.info(f"Stored session can not be reused: {e}")
+        return None
+    return session
+
 def logout():
     if SESSION_PATH.exists():
         SESSION_PATH.unlink()
@@ -32,14 +57,19 @@ def logout():
     return 0
 
 def status():
+    from .session import GaudeamSession
     if not SESSION_PATH.exists():
         raise IgiturError("No session found. Please login first.")
-    session = GaudeamSession.from_file(SESSION_PATH)
-    if not session.is_valid():
+    # get_user_email fails for an expired session, so it doubles as the validity check
+    session = GaudeamSession.from_file(SESSION_PATH, validate=False)
+    try:
+        email = session.get_user_email()
+    except IgiturAuthenticationError:
         raise IgiturError("Session is invalid. Please login again.")
-    print(f"Logged in as {session.get_user_email()} at {session.url()}")
+    print(f"Logged in as {email} at {session.url()}")
 
 def ensure_logged_in() -> GaudeamSession:
+    from .session import GaudeamSession
     if not SESSION_PATH.exists():
         raise IgiturError("No session found. Please login first.")
     session = GaudeamSession.from_file(SESSION_PATH)
@@ -47,39 +77,42 @@ def ensure_logged_in() -> GaudeamSession:
         raise IgiturError("Session is invalid. Please login again.")
     return session
 
-def download(folder_id: str, destination: Path):
+def download(folder_id: str, destination: Path, parallel: int = DEFAULT_PARALLEL):
+    from .drive import GaudeamDriveFolder
     session = ensure_logged_in()
     folder = GaudeamDriveFolder(session, folder_id)
-    folder.download(destination)
+    if not folder.download(destination, parallel):
+        raise IgiturError(f"Not all files of folder '{folder_id}' could be downloaded.")
     return 0
 
-def download_event_media(event_id: str, destination: Path):
+def download_event_media(event_id: str, destination: Path, parallel: int = DEFAULT_PARALLEL):
+    from .calendar import GaudeamEvent
     session = ensure_logged_in()
     event = GaudeamEvent(session, event_id)
-    event.download_media(destination)
+    event.download_media(destination, parallel)
     return 0
 
-def download_event_media_days(days: int,  destination: Path):
+def download_event_media_days(days: int,  destination: Path, parallel: int = DEFAULT_PARALLEL):
+    from .calendar import GaudeamCalendar
     session = ensure_logged_in()
     calendar = GaudeamCalendar(session)
     
-    # Get a time range from now to 14 days ago
+    # Get a time range from now to the given number of days ago
     today = datetime.now()
-    past = today - timedelta(days=14)
+    past = today - timedelta(days=days)
 
     # get all events in the time frame
     events = calendar.global_calendar(past, today)
 
-    # download all media files for each event into a folder named with the event date and title with subfolders for each uploader
-    base_path = Path("./downloaded_events/")
-    for event in events:
-        date_str = event.get_start_datetime().strftime("%Y-%m-%d")
-        folder_name = f"{date_str} {event.get_title()}"
-        event_path = base_path / folder_name
-        event.download_media(event_path)
+    # download all media files for each event into a folder named with the event date and title with subfolders for each uploader, 
+    # the events are downloaded in parallel, sharing one limit of parallel requests
+    if not calendar.download_events_media(events, destination, parallel):
+        raise IgiturError(f"Not all media of the events of the last {days} days could be downloaded.")
+    return 0
 
 
-def upload(folder_id: str, source: Path):
+def upload(folder_id: str, source: Path, parallel: int = DEFAULT_PARALLEL):
+    from .drive import GaudeamDriveFolder
     session = ensure_logged_in()
     folder = GaudeamDriveFolder(session, folder_id)
     if source.exists() is False:
@@ -88,19 +121,36 @@ def upload(folder_id: str, source: Path):
     if source.is_file():
         folder.upload_file(source)
     elif source.is_dir():
-        folder.upload_folder(source)
+        if not folder.upload_folder(source, parallel):
+            raise IgiturError(f"Not all files of '{source}' could be uploaded.")
     return 0
 
-def upload_compressed_images(session: GaudeamSession, folder_id: str, source: Path):
+def upload_compressed_images(session: GaudeamSession, folder_id: str, source: Path, parallel: int = DEFAULT_PARALLEL):
+    from .drive import GaudeamDriveFolder, GaudeamResizedImageUploader
     if source.exists() is False or source.is_dir() is False:
         raise IgiturError(f"Source path '{source}' does not exist or is not a directory.")
 
     folder = GaudeamDriveFolder(session, folder_id)
     uploader = GaudeamResizedImageUploader()
-    uploader.upload_folder_resized(source, folder)
+    if not uploader.upload_folder_resized(source, folder, max_workers=parallel):
+        raise IgiturError(f"Not all images of '{source}' could be uploaded.")
     return 0
 
-def main():
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1, argparse reports other values as usage error"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def add_parallel_argument(parser: argparse.ArgumentParser, help: str):
+    parser.add_argument("--parallel", "--workers", dest="parallel", type=positive_int, help=help, default=DEFAULT_PARALLEL)
+
+@functools.lru_cache(maxsize=None)
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         prog="igitur",
         description="Command line interface to interact with Gaudeam."
@@ -114,6 +164,7 @@ def main():
     )
     login_parser.add_argument("-u", "--email", help="Email address of the user.")
     login_parser.add_argument("-p", "--password", help="Password of the user.")
+    login_parser.add_argument("-f", "--force", action="store_true", help="Login again even if a valid session exists.")
     
     status_parser = subparsers.add_parser("status", help="Check login status.")
     
@@ -124,33 +175,48 @@ def main():
     download_parser = subparsers.add_parser("download", help="Download files from a Gaudeam folder.")
     download_parser.add_argument("folder_id", help="ID of the Gaudeam folder to download from.")
     download_parser.add_argument("destination", help="Destination directory to save files.", default=".")
+    add_parallel_argument(download_parser, "Number of files downloaded in parallel.")
     
     download_event_media_parser = subparsers.add_parser("download-event-media", help="Download all media files from a Gaudeam event.")
     download_event_media_parser.add_argument("event_id", help="ID of the Gaudeam event to download media from.")
     download_event_media_parser.add_argument("destination", help="Destination directory to save files.", default=".")
+    add_parallel_argument(download_event_media_parser, "Number of media files downloaded in parallel.")
     
     download_event_media_days_parser = subparsers.add_parser("download-event-media-days", help="Download all media files from Gaudeam events in the last N days.")
     download_event_media_days_parser.add_argument("days", type=int, help="Number of days to look back for events.", default=14)
     download_event_media_days_parser.add_argument("destination", help="Destination directory to save files.", default=".")
+    add_parallel_argument(download_event_media_days_parser, "Number of media files downloaded in parallel across all events.")
     
     upload_parser = subparsers.add_parser("upload", help="Upload files or the content of a folder to a Gaudeam folder.")
     upload_parser.add_argument("folder_id", help="ID of the Gaudeam folder to upload to.")
     upload_parser.add_argument("source", help="Path to the file or folder to upload.")
+    add_parallel_argument(upload_parser, "Number of files uploaded in parallel.")
 
     upload_image_parser = subparsers.add_parser("upload-images", help="Upload a folder and compress all images before uploading to a Gaudeam folder.")
     upload_image_parser.add_argument("folder_id", help="ID of the Gaudeam folder to upload to.")
     upload_image_parser.add_argument("source", help="Path to the folder containing images to upload.")
+    add_parallel_argument(upload_image_parser, "Number of images uploaded in parallel.")
+
+    return parser
+
+def main():
+    parser = build_parser()
 
-    # Enable tab completion
-    argcomplete.autocomplete(parser)
+    # Enable tab completion, argcomplete sets _ARGCOMPLETE when the shell asks for completions
+    if "_ARGCOMPLETE" in os.environ:
+        import argcomplete
+        argcomplete.autocomplete(parser)
 
     args = parser.parse_args()
 
     try:
         if args.command == "login":
             email = args.email or input("Email: ")
-            password = args.password or getpass("Password: ")
-            login(email, password)
+            if not args.force and existing_session(email) is not None:
+                print(f"Already logged in as {email}, use --force to login again")
+            else:
+                password = args.password or getpass("Password: ")
+                login(email, password)
 
         elif args.command == "logout":
             logout()
@@ -159,20 +225,20 @@ def main():
             status()
 
         elif args.command == "download":
-            download(args.folder_id, Path(args.destination))
+            download(args.folder_id, Path(args.destination), args.parallel)
         
         elif args.command == "download-event-media":
-            download_event_media(args.event_id, Path(args.destination))
+            download_event_media(args.event_id, Path(args.destination), args.parallel)
 
         elif args.command == "download-event-media-days":
-            download_event_media_days(args.days, Path(args.destination))
+            download_event_media_days(args.days, Path(args.destination), args.parallel)
 
         elif args.command == "upload":
-            upload(args.folder_id, Path(args.source))
+            upload(args.folder_id, Path(args.source), args.parallel)
         
         elif args.command == "upload-images":
             session = ensure_logged_in()
-            upload_compressed_images(session, args.folder_id, Path(args.source))
+            upload_compressed_images(session, args.folder_id, Path(args.source), args.parallel)
 
         elif args.command is None or args.command == "help":
             parser.print_help()
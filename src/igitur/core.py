@@ -1,7 +1,116 @@
+import json
+import os
+import secrets
+from email.utils import formatdate
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError: # optional, install with "pip install igitur[fast]"
+    orjson = None
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 class IgiturError(Exception):
     """Base exception for igitur errors."""
     pass
 
 class IgiturAuthenticationError(IgiturError):
     """Raised when authentication fails."""
-    pass
\ No newline at end of file
+    pass
+
+def write_response_to_file(response, file_path: Path|str) -> None:
+    """Writes the body of a streamed response chunk by chunk to a file. 
+    If the server sends a Content-Length, the file is preallocated (on systems 
+    supporting posix_fallocate) so the file system can write it contiguously. 
+    The body is written to a ".part" file next to the target that is renamed when complete, 
+    so an interrupted download never leaves a truncated file that looks finished. 
+    Each download gets its own ".part" file, so two downloads to the same path never mix their bytes. 
+
+    Args:
+        response (requests.Response): Response requested with stream=True
+        file_path (Path | str): The path to save the body to
+    """
+    file_path = Path(file_path)
+    # O_EXCL makes sure the part file is not shared, the mode is the usual one for new files after the umask
+    while True:
+        part_path = file_path.with_name(f"{file_path.name}.{secrets.token_hex(4)}.part")
+        try:
+            fd = os.open(part_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+            break
+        except FileExistsError:
+            continue
+    content_length = int(response.headers.get("Content-Length", 0))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if content_length > 0 and hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(f.fileno(), 0, content_length)
+                except OSError:
+                    pass # not supported by the file system, the file just grows while writing
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+            # the decoded body can differ from Content-Length, e.g. for compressed transfers
+            f.truncate()
+        os.replace(part_path, file_path)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+def conditional_request_headers(file_path: Path|str) -> dict:
+    """Returns headers that let the server answer with 304 Not Modified if the 
+    local file is at least as new as the remote one. 
+
+    Args:
+        file_path (Path | str): The local file the download would be written to
+
+    Returns:
+        dict: The If-Modified-Since header or an empty dict if the file does not exist yet
+    """
+    try:
+        mtime = os.stat(file_path).st_mtime
+    except FileNotFoundError:
+        return {}
+    return {"If-Modified-Since": formatdate(mtime, usegmt=True)}
+
+def json_loads(data: bytes):
+    """Decodes JSON, with orjson if it is installed. 
+
+    Args:
+        data (bytes): The JSON document
+
+    Returns:
+        The decoded JSON document
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(obj, append_newline: bool = False) -> bytes:
+    """Encodes an object as compact UTF-8 JSON, with orjson if it is installed. 
+    No indentation or key sorting is done, which keeps orjson on its fastest path. 
+
+    Args:
+        obj: The object to encode, dicts must have string keys
+        append_newline (bool, optional): End the document with a newline, e.g. for files. Defaults to False.
+
+    Returns:
+        bytes: The JSON document
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE if append_newline else None)
+    data = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+    return data + b"\n" if append_newline else data
+
+def response_json(response):
+    """Decodes the JSON body of a response, with orjson if it is installed. 
+    orjson is several times faster than the json module for big listings 
+    like the members or the calendar. 
+
+    Args:
+        response (requests.Response): The response with a JSON body
+
+    Returns:
+        The decoded JSON body
+    """
+    return json_loads(response.content)
@@ -1,25 +1,123 @@
 from __future__ import annotations
 import logging
+import os
+import re
 import typing
+import io
 import json
 import xml.etree.ElementTree as ET
-import tempfile
-from PIL import Image
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from PIL import Image, ImageOps, ExifTags
 from pathlib import Path
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.fields import RequestField
+from urllib3.filepost import choose_boundary
 
-from .core import IgiturError
+from .core import IgiturError, conditional_request_headers, response_json, write_response_to_file
 from .session import GaudeamSession
 
+# the uploads go to the storage endpoint without the gaudeam cookies, this session 
+# keeps the connections to it alive between uploads
+_storage_client = requests.Session()
+_storage_client.mount("https://", HTTPAdapter(pool_maxsize=GaudeamSession.POOL_MAXSIZE))
+
+# mime types by lower case file extension, built once for all uploads
+_MIME_TYPES = {
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "bmp": "image/bmp",
+    "tiff": "image/tiff",
+    "mp4": "video/mp4",
+    "mov": "video/quicktime",
+    "avi": "video/x-msvideo",
+    "mkv": "video/x-matroska",
+    "pdf": "application/pdf",
+    "doc": "application/msword",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "xls": "application/vnd.ms-excel",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "ppt": "application/vnd.ms-powerpoint",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    # add more as needed
+}
+
+
+class _StreamingMultipartBody:
+    """multipart/form-data body that reads the file while the request is sent. 
+    requests builds the whole body in memory when uploading with files=..., this 
+    keeps the memory usage constant for big files. The length is known up front, 
+    so the upload is sent with a Content-Length as S3 requires. 
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, fields: dict, file_field: str, file_name: str, file_obj: typing.BinaryIO):
+        boundary = choose_boundary()
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+
+        head = b""
+        for name, value in fields.items():
+            field = RequestField(name=name, data=value)
+            field.make_multipart()
+            head += f"--{boundary}\r\n{field.render_headers()}".encode("utf-8")
+            # the signature can contain non string fields like success_action_status, 
+            # they are sent as their text like requests does
+            head += (value if isinstance(value, bytes) else str(value).encode("utf-8")) + b"\r\n"
+        file_part = RequestField(name=file_field, data=b"", filename=file_name)
+        file_part.make_multipart()
+        head += f"--{boundary}\r\n{file_part.render_headers()}".encode("utf-8")
+        tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+        # works for real files and in memory buffers, the file is sent from its current position
+        start = file_obj.tell()
+        file_size = file_obj.seek(0, io.SEEK_END) - start
+        file_obj.seek(start)
+        self._length = len(head) + file_size + len(tail)
+        self._parts = [io.BytesIO(head), file_obj, io.BytesIO(tail)]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        chunks = []
+        while self._parts and size != 0:
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0)
+                continue
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b"".join(chunks)
+
+    def __iter__(self) -> typing.Iterator[bytes]:
+        while True:
+            chunk = self.read(self.CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
 
 class GaudeamDriveFolder:
 
     DIRECTORY_LIST_LIMIT = 80
+    FOLDER_TYPES = ("Folder", "Gallery")
+    FILE_TYPES = ("Photo", "DriveFile")
+    MAX_PARALLEL_LISTINGS = 8
+    LISTING_CACHE_TTL = 15
 
-    def __init__(self, session: GaudeamSession, folder_id: str, properties = None):
+    def __init__(self, session: GaudeamSession, folder_id: str, properties = None, parent: GaudeamDriveFolder|None = None):
         self._session = session
         self._folder_id = folder_id
+        # the parent's listing cache is invalidated when this folder is deleted
+        self._parent = parent
+        # (time.monotonic() of the listing, entries of the listing)
+        self._listing_cache: tuple[float, list[dict]]|None = None
         if properties is None:
             self._properties = self._get_properties()
         else:
@@ -91,44 +189,127 @@ class GaudeamDriveFolder:
         url = f"{self._session.url()}/api/v1/drive/folders"
         response = self._session.client().post(url, json=data)
         if response.status_code == 200:
-            self._properties_force_refresh()
-            new_folder_id = response.json()["id"]
+            # the response describes the new folder, no need to fetch it again
+            new_folder_properties = response.json()
+            new_folder_id = new_folder_properties["id"]
             logging.debug(f"Created sub-folder '{name}' with ID: {new_folder_id}")
-            return GaudeamDriveFolder(self._session, new_folder_id)
+            self.invalidate_listing_cache()
+            return GaudeamDriveFolder(self._session, new_folder_id, new_folder_properties, parent=self)
         else:
             raise IgiturError(f"Error creating sub-folder: {response.status_code}, {response.text}")
 
-    def get_sub_folders(self) -> typing.List[GaudeamDriveFolder]:
-        """Returns a lift of sub folders in the current folder. 
+    def _list_page(self, offset: int) -> typing.List[dict]:
+        url = f"{self._session.url()}/api/v1/drive/folders?parent_id={self._folder_id}&order=%3Ename&offset={offset}&limit={self.DIRECTORY_LIST_LIMIT}"
+        response = self._session.client().get(url)
+
+        if response.status_code != 200:
+            raise IgiturError(f"Error fetching folder contents: {response.status_code}, {response.text}")
+
+        return response_json(response).get("results", [])
+
+    def invalidate_listing_cache(self) -> None:
+        """Forgets the cached listing of this folder, the next listing asks the server again
+        """
+        self._listing_cache = None
+
+    def _iter_entries(self) -> typing.Iterator[dict]:
+        """Yields the entries of the folder listing. A listing younger than LISTING_CACHE_TTL seconds 
+        is served from the cache. If the server fails to list the folder, an older cached listing 
+        is used instead of failing. 
+        """
+        cached = self._listing_cache
+        if cached is not None and time.monotonic() - cached[0] < self.LISTING_CACHE_TTL:
+            yield from cached[1]
+            return
+
+        entries = []
+        listing_time = time.monotonic()
+        try:
+            for entry in self._iter_listing():
+                entries.append(entry)
+                yield entry
+        except IgiturError as e:
+            if cached is None or len(entries) > 0:
+                raise
+            logging.warning(f"Using cached listing of folder '{self._folder_id}': {e}")
+            yield from cached[1]
+            return
+        self._listing_cache = (listing_time, entries)
+
+    def _iter_listing(self) -> typing.Iterator[dict]:
+        """Pages through the folder listing and yields the raw entries in order as soon as each page arrives. 
+        If the first page is full, the following pages are requested in parallel windows that 
+        double in size up to MAX_PARALLEL_LISTINGS, until a page is not full. The next window 
+        is requested before the entries of the current page are handed out, so the listing keeps 
+        loading while the caller processes them. 
+        """
+        batch = self._list_page(0)
+        if len(batch) < self.DIRECTORY_LIST_LIMIT:
+            yield from batch
+            return  # no more results
+
+        with ThreadPoolExecutor(max_workers=self.MAX_PARALLEL_LISTINGS) as executor:
+            def submit_window(offset: int, window: int) -> typing.List[Future]:
+                return [executor.submit(self._list_page, offset + i * self.DIRECTORY_LIST_LIMIT) for i in range(window)]
+
+            offset = self.DIRECTORY_LIST_LIMIT
+            window = min(2, self.MAX_PARALLEL_LISTINGS)
+            futures = submit_window(offset, window)
+            yield from batch
+            while True:
+                next_futures = []
+                for i, future in enumerate(futures):
+                    batch = future.result()
+                    if len(batch) < self.DIRECTORY_LIST_LIMIT:
+                        # last page, the pages after it are empty
+                        for pending in futures[i + 1:]:
+                            pending.cancel()
+                        yield from batch
+                        return
+                    if i == len(futures) - 1:
+                        # prefetch the next window before handing out the last page of this one
+                        offset += window * self.DIRECTORY_LIST_LIMIT
+                        window = min(window * 2, self.MAX_PARALLEL_LISTINGS)
+                        next_futures = submit_window(offset, window)
+                    yield from batch
+                futures = next_futures
+
+    def iter_sub_folders(self) -> typing.Iterator[GaudeamDriveFolder]:
+        """Yields the sub folders in the current folder while the listing is paged through. 
 
         Returns:
-            typing.List[GaudeamDriveFolder]: List of sub folders
+            typing.Iterator[GaudeamDriveFolder]: Iterator over the sub folders
         """
-        offset = 0
-        results = []
+        for entry in self._iter_entries():
+            if entry.get("type") in self.FOLDER_TYPES:
+                yield GaudeamDriveFolder(self._session, entry["id"], entry, parent=self)
 
-        while True:
-            url = f"{self._session.url()}/api/v1/drive/folders?parent_id={self._folder_id}&order=%3Ename&offset={offset}&limit={self.DIRECTORY_LIST_LIMIT}"
-            response = self._session.client().get(url)
+    def iter_files(self) -> typing.Iterator[GaudeamDriveFile]:
+        """Yields the files in the folder while the listing is paged through, 
+        so processing can start before the whole listing is fetched. 
 
-            if response.status_code != 200:
-                raise IgiturError(f"Error fetching folder contents: {response.status_code}, {response.text}")
+        Returns:
+            typing.Iterator[GaudeamDriveFile]: Iterator over the files
+        """
+        for entry in self._iter_entries():
+            if entry.get("type") in self.FILE_TYPES:
+                yield GaudeamDriveFile(self._session, entry["id"], entry, parent=self)
 
-            batch = response.json().get("results", [])
-            if not batch or len(batch) == 0:
-                break  # no more results
+    def get_sub_folders(self) -> typing.List[GaudeamDriveFolder]:
+        """Returns a lift of sub folders in the current folder. 
 
-            for entry in batch:
-                entry_type = entry.get("type")
-                if entry_type in ["Folder", "Gallery"]:
-                    folder = GaudeamDriveFolder(self._session, entry["id"], entry)
-                    results.append(folder)
+        Returns:
+            typing.List[GaudeamDriveFolder]: List of sub folders
+        """
+        return list(self.iter_sub_folders())
 
-            # move to next page
-            offset += self.DIRECTORY_LIST_LIMIT
-            if len(batch) < self.DIRECTORY_LIST_LIMIT:
-                break
-        return results
+    @staticmethod
+    def _index_by_name(sub_folders: typing.Iterable[GaudeamDriveFolder]) -> typing.Dict[str, GaudeamDriveFolder]:
+        # if several sub folders have the same name, the first one is used
+        by_name = {}
+        for sub_folder in sub_folders:
+            by_name.setdefault(sub_folder.get_name(), sub_folder)
+        return by_name
 
     def get_files(self) -> typing.List[GaudeamDriveFile]:
         """Gets a list of files in the folder
@@ -136,31 +317,50 @@ class GaudeamDriveFolder:
         Returns:
             typing.List[GaudeamDriveFile]: List of files
         """
-        offset = 0
-        results = []
+        return list(self.iter_files())
 
-        while True:
-            url = f"{self._session.url()}/api/v1/drive/folders?parent_id={self._folder_id}&order=%3Ename&offset={offset}&limit={self.DIRECTORY_LIST_LIMIT}"
-            response = self._session.client().get(url)
+    def iter_contents(self) -> typing.Iterator[GaudeamDriveFolder|GaudeamDriveFile]:
+        """Yields the sub folders and files in listing order while the listing is paged through. 
 
-            if response.status_code != 200:
-                raise IgiturError(f"Error fetching files from folder: {response.status_code}, {response.text}")
+        Returns:
+            typing.Iterator[GaudeamDriveFolder|GaudeamDriveFile]: Iterator over the sub folders and files
+        """
+        for entry in self._iter_entries():
+            entry_type = entry.get("type")
+            if entry_type in self.FOLDER_TYPES:
+                yield GaudeamDriveFolder(self._session, entry["id"], entry, parent=self)
+            elif entry_type in self.FILE_TYPES:
+                yield GaudeamDriveFile(self._session, entry["id"], entry, parent=self)
 
-            batch = response.json().get("results", [])
-            if not batch:
-                break  # no more results
+    def get_contents(self) -> typing.Tuple[typing.List[GaudeamDriveFolder], typing.List[GaudeamDriveFile]]:
+        """Gets the sub folders and the files of the folder from a single pass over the listing. 
+
+        Returns:
+            typing.Tuple[typing.List[GaudeamDriveFolder], typing.List[GaudeamDriveFile]]: Sub folders and files
+        """
+        sub_folders = []
+        files = []
+        for item in self.iter_contents():
+            if isinstance(item, GaudeamDriveFolder):
+                sub_folders.append(item)
+            else:
+                files.append(item)
+        return sub_folders, files
 
-            for entry in batch:
-                entry_type = entry.get("type")
-                if entry_type in ["Photo", "DriveFile"]:
-                    file_entry = GaudeamDriveFile(self._session, entry["id"], entry)
-                    results.append(file_entry)
-            if len(batch) < self.DIRECTORY_LIST_LIMIT:
-                break
-            # move to next batch
-            offset += self.DIRECTORY_LIST_LIMIT
+    def walk(self) -> typing.Iterator[typing.Tuple[GaudeamDriveFolder, typing.List[GaudeamDriveFolder], typing.List[GaudeamDriveFile]]]:
+        """Walks the folder tree breadth first without recursion, like os.walk. 
+        Each folder is listed once. Sub folders removed from the yielded list are not visited. 
 
-        return results
+        Returns:
+            typing.Iterator[typing.Tuple[GaudeamDriveFolder, typing.List[GaudeamDriveFolder], typing.List[GaudeamDriveFile]]]: 
+                Iterator over (folder, sub folders, files)
+        """
+        pending_folders = deque([self])
+        while pending_folders:
+            folder = pending_folders.popleft()
+            sub_folders, files = folder.get_contents()
+            yield folder, sub_folders, files
+            pending_folders.extend(sub_folders)
 
     def delete(self) -> bool:
         """Deletes the folder including all files. 
@@ -171,75 +371,75 @@ class GaudeamDriveFolder:
         url = f"{self._session.url()}/api/v1/drive/folders/{self._folder_id}"
         response = self._session.client().delete(url)
         if response.status_code == 200:
+            self.invalidate_listing_cache()
+            if self._parent is not None:
+                self._parent.invalidate_listing_cache()
             return True
         else:
             raise IgiturError(f"Error deleting folder: {response.status_code}, {response.text}")
 
-    def delete_content(self) -> bool:
-        """Deletes the content of a folder
+    def delete_content(self, max_workers: int = 8) -> bool:
+        """Deletes the content of a folder. The sub folders and files are deleted in parallel. 
+
+        Args:
+            max_workers (int, optional): Number of parallel delete requests. Defaults to 8.
 
         Returns:
             bool: True if all files and folders could be deleted
         """
-        success = True
-        for folder in self.get_sub_folders():
-            folder_name = folder.get_name()
-            logging.info(f"Deleting folder: {folder_name}")
-            if not folder.delete():
-                logging.warning(f"Could not delete folder '{folder_name}'")
-                success = False
-        for file in self.get_files():
-            file_name = file.get_name()
-            logging.info(f"Deleting folder: {file_name}")
-            if not file.delete():
-                logging.warning(f"Could not delete file '{file_name}'")
-                success = False
-        return success
+        def delete_entry(entry: GaudeamDriveFolder|GaudeamDriveFile) -> bool:
+            entry_name = entry.get_name()
+            logging.info(f"Deleting: {entry_name}")
+            if not entry.delete():
+                logging.warning(f"Could not delete '{entry_name}'")
+                return False
+            return True
+
+        sub_folders, files = self.get_contents()
+        entries = sub_folders + files
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return all(list(executor.map(delete_entry, entries)))
 
     def _mime_type_from_filename(self, filename: str) -> str:
-        extension = filename.split(".")[-1].lower()
-        mime_types = {
-            "jpg": "image/jpeg",
-            "jpeg": "image/jpeg",
-            "png": "image/png",
-            "gif": "image/gif",
-            "bmp": "image/bmp",
-            "tiff": "image/tiff",
-            "mp4": "video/mp4",
-            "mov": "video/quicktime",
-            "avi": "video/x-msvideo",
-            "mkv": "video/x-matroska",
-            "pdf": "application/pdf",
-            "doc": "application/msword",
-            "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            "xls": "application/vnd.ms-excel",
-            "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            "ppt": "application/vnd.ms-powerpoint",
-            "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
-            # add more as needed
-        }
+        extension = Path(filename).suffix[1:].lower()
         # default to binary stream
-        return mime_types.get(extension, "application/octet-stream")
+        return _MIME_TYPES.get(extension, "application/octet-stream")
 
-    def get_size(self) -> int:
+    def get_size(self, max_workers: int = 8) -> int:
         """Returns the file size of the folder including all sub folders. 
+        The folders of the tree are listed in parallel, the file sizes are taken 
+        from the listings without an extra request per file. 
+
+        Args:
+            max_workers (int, optional): Number of folders listed in parallel. Defaults to 8.
 
         Returns:
             int: The file size of the folder.
         """
         size = 0
-        for sub_folder in self.get_sub_folders():
-            size += sub_folder.get_size()
-        for file in self.get_files():
-            size += file.get_size()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {executor.submit(self._get_own_size)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files_size, sub_folders = future.result()
+                    size += files_size
+                    pending.update(executor.submit(sub_folder._get_own_size) for sub_folder in sub_folders)
         return size
 
-    def upload_folder(self, local_folder_path: Path|str) -> bool:
+    def _get_own_size(self) -> typing.Tuple[int, typing.List[GaudeamDriveFolder]]:
+        # size of the files directly in this folder and the sub folders still to visit
+        sub_folders, files = self.get_contents()
+        return sum(file.get_size() for file in files), sub_folders
+
+    def upload_folder(self, local_folder_path: Path|str, max_workers: int = 8) -> bool:
         """Uploads a local folder to the Gaudeam folder. 
         It skips all files that already exist with the same 'download name'. 
+        The folder tree is walked in the calling thread, the files are uploaded in parallel. 
 
         Args:
             local_folder_path (Path | str): Local path of the folder to upload
+            max_workers (int, optional): Number of files uploaded in parallel. Defaults to 8.
 
         Returns:
             bool: True if upload was successful
@@ -248,37 +448,52 @@ class GaudeamDriveFolder:
         if not local_folder_path.is_dir():
             logging.error(f"Local path is not a directory: {local_folder_path}")
             return False
-        for entry in local_folder_path.iterdir():
-            if entry.is_file():
-                for file_in_folder in self.get_files():
-                    if file_in_folder.get_download_name() == entry.name:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            success = self._upload_folder(local_folder_path, executor, futures)
+            for future in as_completed(futures):
+                if not future.result():
+                    logging.error(f"Failed to upload file: {futures[future]}")
+                    success = False
+                    break
+            if not success:
+                for pending in futures:
+                    pending.cancel()
+        return success
+
+    def _upload_folder(self, local_folder_path: Path, executor: Executor, futures: typing.Dict[Future, Path]) -> bool:
+        # the tree is walked with a queue of (local folder, remote folder) instead of recursion
+        pending_folders = deque([(local_folder_path, self)])
+        while pending_folders:
+            local_folder_path, remote_folder = pending_folders.popleft()
+            # list the remote folder once and index it by name
+            sub_folders, files = remote_folder.get_contents()
+            remote_file_names = {file_in_folder.get_download_name() for file_in_folder in files}
+            remote_sub_folders = self._index_by_name(sub_folders)
+            # scandir gets the file type from the directory listing, no extra stat per entry
+            with os.scandir(local_folder_path) as dir_entries:
+                local_entries = [(Path(dir_entry.path), dir_entry.is_file(), dir_entry.is_dir()) for dir_entry in dir_entries]
+            for entry, is_file, is_dir in local_entries:
+                if is_file:
+                    if entry.name in remote_file_names:
                         logging.info(f"File already exists in remote folder, skipping upload: {entry}")
-                        break
-                else:
-                    logging.info(f"Uploading file: {entry} to folder: {self.get_name()}")
-                    success = self.upload_file(entry)
-                    if not success:
-                        logging.error(f"Failed to upload file: {entry}")
-                        return False
-            elif entry.is_dir():
-                # check if folder already exists
-                # if exists -> use existing and continue upload into it
-                # if not -> create folder and continue upload into it
-                for sub_folder in self.get_sub_folders():
-                    if sub_folder.get_name() == entry.name:
+                    else:
+                        logging.info(f"Uploading file: {entry} to folder: {remote_folder.get_name()}")
+                        futures[executor.submit(remote_folder.upload_file, entry)] = entry
+                elif is_dir:
+                    # check if folder already exists
+                    # if exists -> use existing and continue upload into it
+                    # if not -> create folder and continue upload into it
+                    if entry.name in remote_sub_folders:
                         logging.info(f"Sub-folder already exists in remote folder, using existing folder: {entry.name}")
-                        new_remote_folder = sub_folder
-                        break
-                else:
-                    logging.info(f"Creating sub-folder: {entry.name} in folder: {self.get_name()}")
-                    new_remote_folder = self.create_sub_folder(entry.name)
-                    if new_remote_folder is None:
-                        logging.error(f"Failed to create sub-folder: {entry.name}")
-                        return False
-                success = new_remote_folder.upload_folder(entry)
-                if not success:
-                    logging.error(f"Failed to upload folder: {entry}")
-                    return False
+                        new_remote_folder = remote_sub_folders[entry.name]
+                    else:
+                        logging.info(f"Creating sub-folder: {entry.name} in folder: {remote_folder.get_name()}")
+                        new_remote_folder = remote_folder.create_sub_folder(entry.name)
+                        if new_remote_folder is None:
+                            logging.error(f"Failed to create sub-folder: {entry.name}")
+                            return False
+                    pending_folders.append((entry, new_remote_folder))
         return True
 
     def upload_file(self, file_path: Path|str) -> bool:
@@ -291,6 +506,19 @@ class GaudeamDriveFolder:
             bool: True if the upload was successful
         """
         file_path = Path(file_path)
+        with open(file_path, 'rb') as f:
+            return self.upload_file_bytes(file_path.name, f)
+
+    def upload_file_bytes(self, file_name: str, file_obj: typing.BinaryIO) -> bool:
+        """Uploads the content of a file like object as a file to this folder. 
+
+        Args:
+            file_name (str): Name of the file in the folder, including the extension
+            file_obj (typing.BinaryIO): Binary file like object with the content, e.g. an open file or io.BytesIO
+
+        Returns:
+            bool: True if the upload was successful
+        """
         # get upload signature
         url = f"{self._session.url()}/api/v1/drive/sign"
         response = self._session.client().post(url)
@@ -304,30 +532,21 @@ class GaudeamDriveFolder:
         post_endpoint = sign_data["postEndpoint"]
         signature = sign_data["signature"]
 
-        files = {'file': open(file_path, 'rb')}
-
-        upload_response = requests.post(post_endpoint, data=signature, files=files)
+        body = _StreamingMultipartBody(signature, "file", file_name, file_obj)
+        upload_response = _storage_client.post(post_endpoint, data=body, headers={"Content-Type": body.content_type})
         if upload_response.status_code != 201: # created
             logging.error(f"Error uploading file: {upload_response.status_code}, {upload_response.text}")
             return False
         #logging.debug(f"File uploaded response: {upload_response.status_code}, {upload_response.text}")
-        xml_response = upload_response.text
 
         # register file upload at gaudeam
-        xml_response_root = ET.fromstring(xml_response)
-
-        location = xml_response_root.find("Location").text
-        bucket = xml_response_root.find("Bucket").text
-        key = xml_response_root.find("Key").text
-        etag = xml_response_root.find("ETag").text.strip('"')  # remove quotes around ETag
-
-        print("Location:", location)
-        print("Bucket:", bucket)
-        print("Key:", key)
-        print("ETag:", etag)
+        # S3 answers with Location, Bucket, Key and ETag, collect them in one pass
+        uploaded = {element.tag: element.text for element in ET.fromstring(upload_response.content)}
+        key = uploaded["Key"]
+        logging.debug(f"Uploaded file to bucket '{uploaded.get('Bucket')}' at '{uploaded.get('Location')}' with ETag {uploaded.get('ETag')}")
 
         upload_url = f"{self._session.url()}/api/v1/drive/uploaded_files"
-        path = Path(file_path)
+        path = Path(file_name)
         filename_without_ext = path.stem
         filename_with_ext = path.name
 
@@ -344,50 +563,74 @@ class GaudeamDriveFolder:
             }
         }
         upload_response = self._session.client().post(upload_url, json=data)
+        self.invalidate_listing_cache()
         if upload_response.status_code != 200:
             logging.error(f"Error confirming uploaded file: {upload_response.status_code}, {upload_response.text}")
             return False
         #logging.debug(f"Uploaded file confirmation response: {upload_response.status_code}, {upload_response.text}")
         return True
 
-    def download(self, destination_path: Path|str) -> bool:
+    def download(self, destination_path: Path|str, max_workers: int = 8) -> bool:
         """Downloads the whole folder including sub folders and files to a local folder. 
         It skips files that already exist based on 'download name'. 
+        The folder tree is walked in the calling thread while the files are downloaded in parallel. 
 
         Args:
             destination_path (Path | str): Destination path to download to. 
+            max_workers (int, optional): Number of files downloaded in parallel. Defaults to 8.
 
         Returns:
             bool: True if the download was successful
         """
-        destination_folder = Path(destination_path)
+        success = True
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = []
+            self._download(Path(destination_path), executor, futures, set())
+            for future in as_completed(futures):
+                if not future.result():
+                    success = False
+        return success
+
+    def _download(self, destination_folder: Path, executor: Executor, futures: typing.List[Future], 
+                  claimed_files: typing.Set[Path]) -> None:
+        # the tree is walked with a queue of (remote folder, local folder) instead of recursion
+        pending_folders = deque([(self, destination_folder)])
+        while pending_folders:
+            folder, destination_folder = pending_folders.popleft()
+            if not destination_folder.exists():
+                logging.info(f"Destination does not exist yet, creating '{destination_folder}'")
+                destination_folder.mkdir(parents=True)
+
+            if not destination_folder.is_dir():
+                raise IgiturError(f"Destination path is not a directory: {destination_folder}")
+
+            # downloads start while later pages of the listing are still fetched
+            for file_in_folder in folder.iter_contents():
+                if isinstance(file_in_folder, GaudeamDriveFolder):
+                    # visited after this folder, while the files are downloading
+                    pending_folders.append((file_in_folder, destination_folder / file_in_folder.get_name()))
+                    continue
+                file_name = file_in_folder.get_download_name()
+                destination_file = destination_folder / file_name
+                # files are only created when their download finishes, so files with the same 
+                # download name, e.g. in duplicate folders, are caught by the paths claimed so far
+                if destination_file in claimed_files or destination_file.exists():
+                    logging.info(f"Skipping '{destination_file}' - already exists")
+                    continue
+                claimed_files.add(destination_file)
+                # download file
+                logging.info(f"Downloading '{destination_file}'")
+                futures.append(executor.submit(file_in_folder.download, destination_file))
 
-        if not destination_folder.exists():
-            logging.info(f"Destination does not exist yet, creating '{destination_folder}'")
-            destination_folder.mkdir(parents=True)
-        
-        if not destination_folder.is_dir():
-            raise IgiturError(f"Destination path is not a directory: {destination_folder}")
-
-        for sub_folder in self.get_sub_folders():
-            folder_name = sub_folder.get_name()
-            sub_folder.download(destination_folder / folder_name)
-
-        for file_in_folder in self.get_files():
-            file_name = file_in_folder.get_download_name()
-            destination_file = destination_folder / file_name
-            if destination_file.exists():
-                logging.info(f"Skipping '{destination_file}' - already exists")
-                continue
-            # download file
-            logging.info(f"Downloading '{destination_file}'")
-            file_in_folder.download(destination_file)
 class GaudeamDriveFile:
     """A file on gaudeam drive. 
     """
-    def __init__(self, session: GaudeamSession, file_id: str, properties = None):
+
+    def __init__(self, session: GaudeamSession, file_id: str, properties = None, parent: GaudeamDriveFolder|None = None):
         self._session = session
         self._file_id = file_id
+        # the parent's listing cache is invalidated when this file is deleted
+        self._parent = parent
         if properties is None:
             self._properties = self._get_properties()
         else:
@@ -433,7 +676,9 @@ class GaudeamDriveFile:
         return self._properties["file_size"]
 
     def download(self, file_path: str|Path) -> bool:
-        """Downloads a file to a local path
+        """Downloads a file to a local path. 
+        If the file already exists locally, the server is asked to only send it if it 
+        was modified since, an unchanged file is not transferred again. 
 
         Args:
             file_path (str | Path): The path to save the file to
@@ -442,13 +687,17 @@ class GaudeamDriveFile:
             bool: True if the download was successful.
         """
         url = f"{self._session.url()}/drive/uploaded_files/{self._file_id}/download"
-        response = self._session.client().get(url)
-
-        # TODO: error handling
+        headers = conditional_request_headers(file_path)
+        with self._session.client().get(url, headers=headers, stream=True) as response:
+            if response.status_code == 304:
+                logging.info(f"Skipping '{file_path}' - not modified")
+                return True
+            if response.status_code != 200:
+                logging.error(f"Error downloading file: {response.status_code}, {response.text}")
+                return False
 
-        # Save as binary file
-        with open(file_path, "wb") as f:
-            f.write(response.content)
+            # Save as binary file, chunk by chunk to keep memory usage constant
+            write_response_to_file(response, file_path)
         return True
 
     def delete(self) -> bool:
@@ -460,6 +709,8 @@ class GaudeamDriveFile:
         url = f"{self._session.url()}/api/v1/drive/uploaded_files/{self._file_id}"
         response = self._session.client().delete(url)
         if response.status_code == 200:
+            if self._parent is not None:
+                self._parent.invalidate_listing_cache()
             return True
         else:
             logging.error(f"Error deleting file: {response.status_code}, {response.text}")
@@ -473,7 +724,7 @@ class GaudeamDrive:
         url = f"{self._session.url()}/api/v1/drive/categories"
         response = self._session.client().get(url)
         if response.status_code == 200:
-            return response.json()["results"]
+            return response_json(response)["results"]
         else:
             logging.error(f"Error fetching folders: {response.status_code}, {response.text}")
             return []
@@ -487,28 +738,80 @@ class GaudeamDrive:
             logging.error(f"Error deleting folder: {response.status_code}, {response.text}")
             return False
 
+def _save_as_jpeg_resized(input_path, output_path, max_width: int, max_height: int, jpeg_quality: int) -> None:
+    # module level function so it can be run in worker processes
+    with Image.open(input_path) as img:
+        # camera images are often stored rotated with an EXIF orientation tag that is not 
+        # written to the resized jpeg, so the rotation is applied to the pixels. 
+        # Orientations 5-8 swap width and height, so we resize into the swapped box 
+        # and rotate the already small image afterwards
+        orientation = img.getexif().get(ExifTags.Base.Orientation, 1)
+        if orientation in (5, 6, 7, 8):
+            max_size = (max_height, max_width)
+        else:
+            max_size = (max_width, max_height)
+
+        # let libjpeg decode jpegs at 1/2, 1/4 or 1/8 of the size as long as they stay 
+        # at least twice the target size, this skips most of the decoding work for 
+        # big camera images. Other formats ignore the draft. 
+        img.draft("RGB", (max_size[0] * 2, max_size[1] * 2))
+
+        # Keep aspect ratio, reducing_gap first shrinks by an integer factor with the 
+        # cheap box filter (Image.reduce) so LANCZOS only runs on an image at most 
+        # twice the target size
+        img.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        img = ImageOps.exif_transpose(img)
+
+        # Ensure no alpha channel (JPEG doesn’t support transparency)
+        if img.mode in ("RGBA", "LA"):
+            img = img.convert("RGB")
+
+        # optimized huffman tables and progressive encoding make the file smaller without losing quality, 
+        # 4:2:0 chroma subsampling is set explicitly so the upload size does not depend on the Pillow build
+        img.save(output_path, format="JPEG", quality=jpeg_quality, optimize=True, progressive=True, subsampling=2)
+
+def _resize_to_jpeg_bytes(input_path, max_width: int, max_height: int, jpeg_quality: int) -> bytes:
+    # resized jpeg in memory, the bytes are sent back from the worker processes
+    buffer = io.BytesIO()
+    _save_as_jpeg_resized(input_path, buffer, max_width, max_height, jpeg_quality)
+    return buffer.getvalue()
+
 class GaudeamResizedImageUploader():
     def __init__(self, max_width: int = 2000, max_height: int = 2000, jpeg_quality = 90):
+        """Uploader that shrinks images before uploading them as jpeg. 
+        Images are scaled down with LANCZOS so that their longest edge fits into the 
+        max size, images that are already smaller are not scaled up. 
+
+        Args:
+            max_width (int, optional): Maximum width of the uploaded images. Defaults to 2000.
+            max_height (int, optional): Maximum height of the uploaded images. Defaults to 2000.
+            jpeg_quality (int, optional): Quality of the jpeg encoding. Defaults to 90.
+        """
         self._max_width = max_width
         self._max_height = max_height
         self._jpeg_quality = jpeg_quality
         self._skip_file_names = []
+        self._skip_file_names_regex = None
         self._allowed_extensions = [".jpg", ".jpeg", ".png"]
 
     def add_skip_file_name(self, skip_file_name: str):
         self._skip_file_names.append(skip_file_name)
+        # rebuilt on the next check, adding many names compiles the regex only once
+        self._skip_file_names_regex = None
 
     def save_as_jpeg_resized(self, input_path, output_path):
-        img = Image.open(input_path)
+        _save_as_jpeg_resized(input_path, output_path, self._max_width, self._max_height, self._jpeg_quality)
 
-        # Keep aspect ratio
-        img.thumbnail((self._max_width, self._max_height), Image.Resampling.LANCZOS)
+    def resize_to_buffer(self, input_path) -> io.BytesIO:
+        """Resizes an image to a jpeg in memory. 
 
-        # Ensure no alpha channel (JPEG doesn’t support transparency)
-        if img.mode in ("RGBA", "LA"):
-            img = img.convert("RGB")
+        Args:
+            input_path: Path of the image to resize
 
-        img.save(output_path, format="JPEG", quality=self._jpeg_quality)
+        Returns:
+            io.BytesIO: Buffer with the resized jpeg, positioned at the start
+        """
+        return io.BytesIO(_resize_to_jpeg_bytes(input_path, self._max_width, self._max_height, self._jpeg_quality))
 
     def _in_allowed_extensions(self, file_path: Path) -> bool:
         source_extension = file_path.suffix.lower()
@@ -516,117 +819,152 @@ class GaudeamResizedImageUploader():
         return source_extension in self._allowed_extensions
 
     def _in_skip_files(self, file_path: Path) -> bool:
-        file_name = str(file_path.name)
-        for skip_file_name in self._skip_file_names:
-            if str(skip_file_name).lower() in file_name.lower():
-                # skip files that contain the substring which is in skipfile in the file name
-                return True
-        return False
+        if len(self._skip_file_names) == 0:
+            return False
+        if self._skip_file_names_regex is None:
+            # one alternation of all skip names, so each file name is scanned only once
+            self._skip_file_names_regex = re.compile("|".join(re.escape(str(name).lower()) for name in self._skip_file_names))
+        # skip files that contain any of the skip names as substring in the file name
+        return self._skip_file_names_regex.search(file_path.name.lower()) is not None
 
-    def _file_name_exists(self, file_name: str,  gaudeam_files_in_folder: typing.List[GaudeamDriveFile]):
-        for file_in_folder in gaudeam_files_in_folder:
-            if file_in_folder.get_download_name() == file_name:
-                return True
-        return False
-
-    def delete_duplicates(self, gaudeam_folder: GaudeamDriveFolder, dry_run = False):
-        sub_folders = gaudeam_folder.get_sub_folders()
-        sub_folders = sorted(sub_folders, key=lambda f: f.get_name())
-
-        # clean duplicate folders
-        if len(sub_folders) > 0:
-            first_folder = sub_folders.pop(0)
-            while len(sub_folders) > 0:
-                next_folder = sub_folders.pop(0)
-                if first_folder.get_name() == next_folder.get_name():
-                    # duplicate, eliminate
-                    if not dry_run:
-                        logging.warning(f"Duplicate folder '{next_folder.get_name()} - deleting'")
-                        next_folder.delete()
-                    else:
-                        logging.info(f"[DRY RUN] Duplicate folder '{next_folder.get_name()}'")
-                else: 
-                    # they are different, so we eliminated all duplicates
-                    first_folder = next_folder
-
-        sub_files = gaudeam_folder.get_files()
-        sub_files = sorted(sub_files, key=lambda f: f.get_name())
-
-        # clean duplicate files
-        if len(sub_files) > 0:
-            first_file = sub_files.pop(0)
-            while len(sub_files) > 0:
-                next_file = sub_files.pop(0)
-                if first_file.get_name() == next_file.get_name():
-                    # duplicate, eliminate
-                    if not dry_run:
-                        logging.warning(f"Duplicate file '{next_file.get_name()} - deleting'")
-                        next_file.delete()
-                    else:
-                        logging.info(f"[DRY RUN] Duplicate file '{next_file.get_name()}'")
-                else: 
-                    # they are different, so we elimnated all duplicates
-                    first_file = next_file
-        
-        # now reread and run on the leftover
-        sub_folders = gaudeam_folder.get_sub_folders()
-        for sub_folder in sub_folders:
-            self.delete_duplicates(sub_folder, dry_run)
+    def delete_duplicates(self, gaudeam_folder: GaudeamDriveFolder, dry_run = False, max_workers: int = 8) -> bool:
+        """Deletes sub folders and files that have the same name as another entry in the 
+        same folder, the first entry of the listing is kept. Runs through all sub folders. 
 
-    def delete_empty_sub_folders(self, gaudeam_folder: GaudeamDriveFolder, dry_run = False):
-        sub_folders = gaudeam_folder.get_sub_folders()
-        if len(sub_folders) > 0:
-            # if we have folders we have to go in deep first
-            for sub_folder in sub_folders:
-                self.delete_empty_sub_folders(sub_folder, dry_run)
-            # refresh the folders, we might have deleted some
-            sub_folders = gaudeam_folder.get_sub_folders()
-        files = gaudeam_folder.get_files()
-        if len(sub_folders) + len(files) == 0:
-            # empty
-            if not dry_run:
-                logging.warning(f"Empty folder: {gaudeam_folder.get_name()} - deleting")
-                gaudeam_folder.delete()
-            else:
-                logging.info(f"[DRY RUN] Empty folder: {gaudeam_folder.get_name()}")
-            return
+        Args:
+            gaudeam_folder (GaudeamDriveFolder): Folder to clean up
+            dry_run (bool, optional): Only log the duplicates without deleting them. Defaults to False.
+            max_workers (int, optional): Number of duplicates deleted in parallel. Defaults to 8.
 
-    def delete_remote_orphan_files(self, local_folder_path: Path|str, gaudeam_folder: GaudeamDriveFolder, dry_run = False):
-        local_folder_path = Path(local_folder_path)
-        local_sub_folders = [
-                            item.name
-                            for item in local_folder_path.iterdir()
-                            if item.is_dir()
-                        ]
-        local_target_file_names = [
-                            self._get_target_name_from_file_path(item)
-                            for item in local_folder_path.iterdir()
-                            if item.is_file() \
-                                and self._in_allowed_extensions(item) \
-                                and not self._in_skip_files(item)
-                        ]
-        for gaudeam_sub_folder in gaudeam_folder.get_sub_folders():
-            gaudeam_sub_folder_name = gaudeam_sub_folder.get_name()
-            if gaudeam_sub_folder_name not in local_sub_folders:
-                # folder does not exist locally -> delete
+        Returns:
+            bool: True if all duplicates could be deleted
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return self._delete_duplicates(gaudeam_folder, dry_run, executor)
+
+    def _delete_duplicates(self, gaudeam_folder: GaudeamDriveFolder, dry_run: bool, executor: Executor) -> bool:
+        futures = {}
+        for _, sub_folders, files in gaudeam_folder.walk():
+            # the first entry of a name in listing order is kept, all later ones are duplicates
+            kept_folders, duplicate_folders = self._split_duplicates(sub_folders)
+            _, duplicate_files = self._split_duplicates(files)
+            # only walk into the kept folders, the duplicates are deleted
+            sub_folders[:] = kept_folders
+
+            for duplicate in duplicate_folders:
                 if not dry_run:
-                    logging.warning(f"Deleting gaudeam folder '{gaudeam_sub_folder_name}' because it's not in {local_folder_path}")
-                    gaudeam_sub_folder.delete()
+                    logging.warning(f"Duplicate folder '{duplicate.get_name()} - deleting'")
+                    futures[executor.submit(duplicate.delete)] = duplicate.get_name()
                 else:
-                    logging.info(f"[DRY_RUN] Deleting gaudeam folder '{gaudeam_sub_folder_name}' because it's not in {local_folder_path}")
+                    logging.info(f"[DRY RUN] Duplicate folder '{duplicate.get_name()}'")
+            for duplicate in duplicate_files:
+                if not dry_run:
+                    logging.warning(f"Duplicate file '{duplicate.get_name()} - deleting'")
+                    futures[executor.submit(duplicate.delete)] = duplicate.get_name()
+                else:
+                    logging.info(f"[DRY RUN] Duplicate file '{duplicate.get_name()}'")
+        return self._all_deleted(futures)
+
+    @staticmethod
+    def _split_duplicates(items: typing.List[GaudeamDriveFolder|GaudeamDriveFile]) -> typing.Tuple[list, list]:
+        # one pass with a dict of the names seen so far, returns (kept, duplicates)
+        seen = {}
+        duplicates = []
+        for item in items:
+            name = item.get_name()
+            if name in seen:
+                duplicates.append(item)
             else:
-                # folder exists locally -> check it's sub contents
-                sub_folder_path = local_folder_path / gaudeam_sub_folder_name
-                self.delete_remote_orphan_files(sub_folder_path, gaudeam_sub_folder)
+                seen[name] = item
+        return list(seen.values()), duplicates
 
-        for gaudeam_sub_file in gaudeam_folder.get_files():
-            gaudeam_sub_file_name = gaudeam_sub_file.get_download_name()
-            if gaudeam_sub_file_name not in local_target_file_names:
+    def delete_empty_sub_folders(self, gaudeam_folder: GaudeamDriveFolder, dry_run = False):
+        # deepest folders first, so folders that only contain empty folders become empty as well
+        folders = [folder for folder, _, _ in gaudeam_folder.walk()]
+        for folder in reversed(folders):
+            # the listing of a folder is refreshed when one of its sub folders is deleted
+            sub_folders, files = folder.get_contents()
+            if len(sub_folders) + len(files) == 0:
+                # empty
                 if not dry_run:
-                    logging.warning(f"Deleting gaudeam file '{gaudeam_sub_file_name}' because it's not derived from a file in {local_folder_path}")
-                    gaudeam_sub_file.delete()
+                    logging.warning(f"Empty folder: {folder.get_name()} - deleting")
+                    folder.delete()
+                else:
+                    logging.info(f"[DRY RUN] Empty folder: {folder.get_name()}")
+
+    def delete_remote_orphan_files(self, local_folder_path: Path|str, gaudeam_folder: GaudeamDriveFolder, dry_run = False, max_workers: int = 8) -> bool:
+        """Deletes the sub folders and files of a gaudeam folder that have no local counterpart. 
+        The deletes are sent in parallel while the folder tree is walked. 
+
+        Args:
+            local_folder_path (Path | str): Local folder the gaudeam folder was uploaded from
+            gaudeam_folder (GaudeamDriveFolder): Gaudeam folder to clean up
+            dry_run (bool, optional): Only log the orphans without deleting them. Defaults to False.
+            max_workers (int, optional): Number of parallel delete requests. Defaults to 8.
+
+        Returns:
+            bool: True if all orphans could be deleted
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            self._delete_remote_orphan_files(Path(local_folder_path), gaudeam_folder, dry_run, executor, futures)
+            return self._all_deleted(futures)
+
+    @staticmethod
+    def _all_deleted(futures: typing.Dict[Future, str]) -> bool:
+        # waits for all deletes, a failed delete does not stop the others, 
+        # folder deletes raise on failure while file deletes return False
+        success = True
+        for future in as_completed(futures):
+            try:
+                deleted = future.result()
+            except IgiturError as e:
+                logging.error(str(e))
+                deleted = False
+            if not deleted:
+                logging.warning(f"Could not delete '{futures[future]}'")
+                success = False
+        return success
+
+    def _delete_remote_orphan_files(self, local_folder_path: Path, gaudeam_folder: GaudeamDriveFolder, dry_run: bool, 
+                                    executor: Executor, futures: typing.Dict[Future, str]):
+        # the tree is walked with a queue of (local folder, remote folder) instead of recursion
+        pending_folders = deque([(local_folder_path, gaudeam_folder)])
+        while pending_folders:
+            local_folder_path, gaudeam_folder = pending_folders.popleft()
+            # one pass over the local folder, scandir gets the file type without an extra stat per entry
+            local_sub_folders = set()
+            local_target_file_names = set()
+            with os.scandir(local_folder_path) as dir_entries:
+                for dir_entry in dir_entries:
+                    if dir_entry.is_dir():
+                        local_sub_folders.add(dir_entry.name)
+                    elif dir_entry.is_file():
+                        item = Path(dir_entry.path)
+                        if self._in_allowed_extensions(item) and not self._in_skip_files(item):
+                            local_target_file_names.add(self._get_target_name_from_file_path(item))
+            gaudeam_sub_folders, gaudeam_files = gaudeam_folder.get_contents()
+            for gaudeam_sub_folder in gaudeam_sub_folders:
+                gaudeam_sub_folder_name = gaudeam_sub_folder.get_name()
+                if gaudeam_sub_folder_name not in local_sub_folders:
+                    # folder does not exist locally -> delete
+                    if not dry_run:
+                        logging.warning(f"Deleting gaudeam folder '{gaudeam_sub_folder_name}' because it's not in {local_folder_path}")
+                        futures[executor.submit(gaudeam_sub_folder.delete)] = gaudeam_sub_folder_name
+                    else:
+                        logging.info(f"[DRY_RUN] Deleting gaudeam folder '{gaudeam_sub_folder_name}' because it's not in {local_folder_path}")
                 else:
-                    logging.info(f"[DRY_RUN] Deleting gaudeam file '{gaudeam_sub_file_name}' because it's not derived from a file in {local_folder_path}")
+                    # folder exists locally -> check it's sub contents
+                    pending_folders.append((local_folder_path / gaudeam_sub_folder_name, gaudeam_sub_folder))
+
+            for gaudeam_sub_file in gaudeam_files:
+                gaudeam_sub_file_name = gaudeam_sub_file.get_download_name()
+                if gaudeam_sub_file_name not in local_target_file_names:
+                    if not dry_run:
+                        logging.warning(f"Deleting gaudeam file '{gaudeam_sub_file_name}' because it's not derived from a file in {local_folder_path}")
+                        futures[executor.submit(gaudeam_sub_file.delete)] = gaudeam_sub_file_name
+                    else:
+                        logging.info(f"[DRY_RUN] Deleting gaudeam file '{gaudeam_sub_file_name}' because it's not derived from a file in {local_folder_path}")
 
     def _get_target_name_from_file_path(self, local_file_path: Path):
         local_file_path = Path(local_file_path)
@@ -634,57 +972,122 @@ class GaudeamResizedImageUploader():
         target_name = local_file_path.stem + target_extension
         return target_name
 
-    def upload_folder_resized(self, local_folder_path: Path|str, gaudeam_folder: GaudeamDriveFolder) -> bool:
+    def _upload_resized(self, local_file_path: Path, target_name: str, jpeg_bytes: bytes, gaudeam_folder: GaudeamDriveFolder) -> bool:
+        logging.info(f"Uploading file: {local_file_path} as '{target_name}' to folder: {gaudeam_folder.get_name()}")
+        success = gaudeam_folder.upload_file_bytes(target_name, io.BytesIO(jpeg_bytes))
+        if not success:
+            logging.error(f"Failed to upload file: {local_file_path}")
+        return success
+
+    def upload_folder_resized(self, local_folder_path: Path|str, gaudeam_folder: GaudeamDriveFolder, max_workers: int = 4, resize_workers: int|None = None) -> bool:
+        """Uploads resized versions of all images in a local folder to a gaudeam folder. 
+        Images that already exist in the gaudeam folder are skipped before resizing, 
+        so repeated runs only resize and upload new images. 
+        Images are resized in a pool of worker processes to use all cores and each image 
+        is uploaded by a pool of threads as soon as it is resized. The resized images 
+        are kept in memory, nothing is written to disk. At most 2 * max_workers images 
+        are resized or uploaded at a time, so the memory use does not grow with the folder size. 
+
+        Scripts calling this on Windows or macOS have to guard their entry point 
+        with `if __name__ == "__main__":` as the worker processes import the main module. 
+
+        Args:
+            local_folder_path (Path | str): Local path of the folder to upload
+            gaudeam_folder (GaudeamDriveFolder): Gaudeam folder to upload to
+            max_workers (int, optional): Number of images uploaded in parallel. Defaults to 4.
+            resize_workers (int | None, optional): Number of processes resizing images. Defaults to the number of CPUs.
+
+        Returns:
+            bool: True if upload was successful
+        """
+        with ProcessPoolExecutor(max_workers=resize_workers) as resize_executor, \
+                ThreadPoolExecutor(max_workers=max_workers) as upload_executor:
+            return self._upload_folder_resized(Path(local_folder_path), gaudeam_folder, 
+                                               resize_executor, upload_executor, 2 * max_workers)
+
+    def _upload_folder_resized(self, local_folder_path: Path, gaudeam_folder: GaudeamDriveFolder, 
+                               resize_executor: Executor, upload_executor: Executor, max_in_flight: int) -> bool:
         local_folder_path = Path(local_folder_path)
         if not local_folder_path.is_dir():
             logging.error(f"Local path is not a directory: {local_folder_path}")
             return False
-        # get the files that already exist in the folder
-        gaudeam_files_in_folder = gaudeam_folder.get_files()
-        gaudeam_sub_folders_in_folder = gaudeam_folder.get_sub_folders()
-        for entry in local_folder_path.iterdir():
-            if entry.is_file():
-                ## skip files based on extension
-                if not self._in_allowed_extensions(entry):
-                    # skip files like videos, that we don't want to upload
-                    logging.info(f"Skipping: {entry}: File type is not in processing list ({self._allowed_extensions})")
-                    continue
-
-                ## skip files based on name blacklist
-                if self._in_skip_files(entry):
-                    logging.info(f"Skipping: {entry}: File name is skipped because it contains a blacklisted name ({self._skip_file_names}), ")
-                    continue
-
-                ## skip files if they already exist remotely
-                target_name = self._get_target_name_from_file_path(entry)
-                if self._file_name_exists(target_name, gaudeam_files_in_folder):
-                    logging.info(f"Skipping: {entry}: File already exists in remote folder as '{target_name}'")
-                    continue
-
-                # if not exists, upload shrinked version
-                with tempfile.TemporaryDirectory() as tmpdirname:
-                    target_path = Path(tmpdirname) / target_name
-                    logging.info(f"Resizing file: {entry} as: {target_path}")
-                    self.save_as_jpeg_resized(entry, target_path)
-                    logging.info(f"Uploading file: {target_path} to folder: {gaudeam_folder.get_name()}")
-                    success = gaudeam_folder.upload_file(target_path)
-                    if not success:
-                        logging.error(f"Failed to upload file: {target_path}")
-                        return False
-            elif entry.is_dir():
-                for sub_folder in gaudeam_sub_folders_in_folder:
-                    if sub_folder.get_name() == entry.name:
-                        logging.info(f"Sub-folder already exists in remote folder, using existing folder: {entry.name}")
-                        new_remote_folder = sub_folder
+        # the tree is walked with a queue of (local folder, remote folder) instead of recursion
+        pending_folders = deque([(local_folder_path, gaudeam_folder)])
+        while pending_folders:
+            local_folder_path, gaudeam_folder = pending_folders.popleft()
+            # get the files that already exist in the folder, indexed by name
+            gaudeam_sub_folders, gaudeam_files = gaudeam_folder.get_contents()
+            gaudeam_file_names = {file_in_folder.get_download_name() for file_in_folder in gaudeam_files}
+            gaudeam_sub_folders_by_name = GaudeamDriveFolder._index_by_name(gaudeam_sub_folders)
+            files_to_upload = []
+            local_sub_folders = []
+            # scandir gets the file type from the directory listing, no extra stat per entry
+            with os.scandir(local_folder_path) as dir_entries:
+                for dir_entry in dir_entries:
+                    entry = Path(dir_entry.path)
+                    if dir_entry.is_file():
+                        ## skip files based on extension
+                        if not self._in_allowed_extensions(entry):
+                            # skip files like videos, that we don't want to upload
+                            logging.info(f"Skipping: {entry}: File type is not in processing list ({self._allowed_extensions})")
+                            continue
+
+                        ## skip files based on name blacklist
+                        if self._in_skip_files(entry):
+                            logging.info(f"Skipping: {entry}: File name is skipped because it contains a blacklisted name ({self._skip_file_names}), ")
+                            continue
+
+                        ## skip files if they already exist remotely
+                        target_name = self._get_target_name_from_file_path(entry)
+                        if target_name in gaudeam_file_names:
+                            logging.info(f"Skipping: {entry}: File already exists in remote folder as '{target_name}'")
+                            continue
+
+                        # if not exists, upload shrinked version
+                        files_to_upload.append((entry, target_name))
+                    elif dir_entry.is_dir():
+                        local_sub_folders.append(entry)
+
+            # resize in the worker processes and upload each image as soon as it is resized, 
+            # new resizes are only started when an upload finished, so at most max_in_flight 
+            # resized images are held in memory
+            pending_files = iter(files_to_upload)
+            # future -> (is_upload, local file, target name)
+            in_flight: dict[Future, tuple[bool, Path, str]] = {}
+            while True:
+                while len(in_flight) < max_in_flight:
+                    next_file = next(pending_files, None)
+                    if next_file is None:
                         break
+                    entry, target_name = next_file
+                    logging.info(f"Resizing file: {entry} as: {target_name}")
+                    future = resize_executor.submit(_resize_to_jpeg_bytes, entry, 
+                                                    self._max_width, self._max_height, self._jpeg_quality)
+                    in_flight[future] = (False, entry, target_name)
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # removing the finished future releases its image bytes
+                    is_upload, entry, target_name = in_flight.pop(future)
+                    if not is_upload:
+                        upload_future = upload_executor.submit(self._upload_resized, entry, target_name, 
+                                                               future.result(), gaudeam_folder)
+                        in_flight[upload_future] = (True, entry, target_name)
+                    elif not future.result():
+                        for pending in in_flight:
+                            pending.cancel()
+                        return False
+
+            for entry in local_sub_folders:
+                if entry.name in gaudeam_sub_folders_by_name:
+                    logging.info(f"Sub-folder already exists in remote folder, using existing folder: {entry.name}")
+                    new_remote_folder = gaudeam_sub_folders_by_name[entry.name]
                 else:
                     logging.info(f"Creating sub-folder: {entry.name} in folder: {gaudeam_folder.get_name()}")
                     new_remote_folder = gaudeam_folder.create_sub_folder(entry.name)
                     if new_remote_folder is None:
                         logging.error(f"Failed to create sub-folder: {entry.name}")
                         return False
-                success = self.upload_folder_resized(entry, new_remote_folder)
-                if not success:
-                    logging.error(f"Failed to upload folder: {entry.path}")
-                    return False
+                pending_folders.append((entry, new_remote_folder))
         return True
@@ -1,37 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from .session import GaudeamSession
 
+# query parameter values of the boolean filters
+_BOOL = {True: "true", False: "false"}
+
 class GaudeamMembers:
     """Member directory of the gaudeam instance. 
     """
+
+    PAGE_LIMIT = 100
+    MAX_PARALLEL_PAGES = 8
+
     def __init__(self, gaudeam_session: GaudeamSession):
         self._session = gaudeam_session
 
+    def _get_members_page(self, params: dict, offset: int) -> dict:
+        page_params = dict(params, offset=offset)
+        status_code, data = self._session.cached_get_json(f"{self._session.url()}/api/v1/members/index", params=page_params)
+        if status_code != 200:
+            raise RuntimeError(f"Error fetching members: {status_code}, {data}")
+        return data
+
+    def _get_members_count(self, params: dict) -> int:
+        status_code, data = self._session.cached_get_json(f"{self._session.url()}/api/v1/members/count", params=params)
+        if status_code != 200:
+            raise RuntimeError(f"Error fetching members: {status_code}, {data}")
+        return data["count"]
+
     def get_members(self, include_dead=False, include_alliances=False, include_resigned=False, seach_term=""):
-        offset = 0
-        limit = 100
+        limit = self.PAGE_LIMIT
         params = {
             "q": seach_term,
-            "offset": offset,
+            "offset": 0,
             "limit": limit,
             "order": "name",
             "asc": "true",
-            "dead": str(include_dead).lower(),
-            "alliances": str(include_alliances).lower(),
-            "resigned": str(include_resigned).lower()
+            "dead": _BOOL[bool(include_dead)],
+            "alliances": _BOOL[bool(include_alliances)],
+            "resigned": _BOOL[bool(include_resigned)]
         }
 
-        response_count = self._session.client().get(f"{self._session.url()}/api/v1/members/count", params=params)
-        if response_count.status_code != 200: 
-            raise RuntimeError(f"Error fetching members: {response_count.status_code}, {response_count.text}")
-        num_records = response_count.json()["count"]
-
-        response_members = self._session.client().get(f"{self._session.url()}/api/v1/members/index", params=params)
-        if response_members.status_code != 200:
-            raise RuntimeError(f"Error fetching members: {response_count.status_code}, {response_count.text}")
-        members = response_members.json()["results"]
-        while len(members) < num_records:
-            offset += limit
-            params["offset"] = offset
-            response_members = self._session.client().get(f"{self._session.url()}/api/v1/members/index", params=params)
-            members.extend(response_members.json()["results"])
+        with ThreadPoolExecutor(max_workers=self.MAX_PARALLEL_PAGES) as executor:
+            # the count is requested together with the first page to save a round trip
+            count_future = executor.submit(self._get_members_count, params)
+            members = self._get_members_page(params, 0)["results"]
+            if len(members) < limit:
+                return members
+            num_records = count_future.result()
+
+            # the number of pages is known now, so the remaining pages are fetched in parallel
+            pages = (num_records + limit - 1) // limit
+            offsets = [page * limit for page in range(1, pages)]
+            pages = executor.map(lambda offset: self._get_members_page(params, offset)["results"], offsets)
+            # map keeps the order of the offsets, so the members stay sorted by name
+            members.extend(member for page in pages for member in page)
         return members
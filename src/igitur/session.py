@@ -1,17 +1,58 @@
 from __future__ import annotations
-import json
+import html
+import importlib.metadata
+import os
+import re
+import tempfile
+import threading
+import time
+import typing
 from pathlib import Path
+from urllib.parse import urlencode
 
-import requests
-from bs4 import BeautifulSoup
+from .core import IgiturError, IgiturAuthenticationError, json_dumps, json_loads, response_json
 
-from .core import IgiturError, IgiturAuthenticationError
+# requests is imported when the first client is created, 
+# so that importing the module stays cheap for code that never talks to gaudeam
+if typing.TYPE_CHECKING:
+    import requests
+
+def _user_agent() -> str:
+    # the version comes from the installed package metadata, so it follows pyproject.toml
+    try:
+        return f"python-igitur/{importlib.metadata.version('igitur')}"
+    except importlib.metadata.PackageNotFoundError:
+        return "python-igitur"
+
+# sessions loaded by from_file, keyed by resolved file path, with the file's (inode, size, mtime) when it was read, 
+# save_to_file replaces the file, so a new login gives a new inode even within one mtime tick
+_loaded_sessions: dict[Path, tuple[tuple[int, int, int], GaudeamSession]] = {}
+
+# value of the hidden authenticity_token input of the login form, in either attribute order
+_AUTH_TOKEN_RE = re.compile(
+    rb'<input[^>]*?name="authenticity_token"[^>]*?value="([^"]*)"'
+    rb'|<input[^>]*?value="([^"]*)"[^>]*?name="authenticity_token"')
+# instance subdomain in the redirect after a successful login
+_SUBDOMAIN_RE = re.compile(r"https://([^./]+)\.gaudeam\.de")
 
 class GaudeamSession():
     """Session information to talk to Gaudeam. 
     """
 
-    def __init__(self, gaudeam_session_cookie: str, subdomain: str):
+    __slots__ = ("_gaudeam_session", "_subdomain", "_base_url", "_current_member_url", "_client",
+                 "_current_member_cache", "_current_member_cache_ts", "_head_supported",
+                 "_valid_until", "_get_cache", "_get_cache_lock")
+
+    VALIDATION_CACHE_TTL = 60
+    POOL_CONNECTIONS = 16
+    # listings page in parallel inside parallel tree operations, so allow plenty of connections per host
+    POOL_MAXSIZE = 64
+    USER_AGENT = _user_agent()
+    LOGIN_PAGE_CHUNK_SIZE = 4096
+    GET_CACHE_TTL = 15
+    GET_CACHE_MAX_ENTRIES = 1024
+
+    def __init__(self, gaudeam_session_cookie: str, subdomain: str, client: requests.Session|None = None):
         """Creates a session for Gaudeam
 
         Args:
@@ -19,12 +60,50 @@ class GaudeamSession():
                                     exported from a logged in browser session
             subdomain (str): Subdomain of your gaudeam instance, 
                                     e.g. "yourinstance" for "yourinstance.gaudeam.de"
+            client (requests.Session | None, optional): Client to reuse with its connection pool, 
+                                    a new one is created if None. Defaults to None.
         """
         self._gaudeam_session = gaudeam_session_cookie
         self._subdomain = subdomain
+        self._base_url = f"https://{subdomain}.gaudeam.de"
+        self._current_member_url = f"{self._base_url}/api/v1/current_member"
 
-        self._client = requests.Session()
+        self._client = client if client is not None else self._create_client()
         self._client.cookies.update({"_gaudeam_session": gaudeam_session_cookie})
+        # body of the last successful /api/v1/current_member request and when it was fetched
+        self._current_member_cache: dict | None = None
+        self._current_member_cache_ts = 0.0
+        # is_valid checks with HEAD until the server answers 405 Method Not Allowed
+        self._head_supported = True
+        self._valid_until = 0.0
+        # decoded bodies of successful cached_get_json requests with their expiry time (time.monotonic()), 
+        # keyed by url and query parameters, in insertion order so the oldest entry is first
+        self._get_cache: dict[tuple[str, frozenset], tuple[float, typing.Any]] = {}
+        self._get_cache_lock = threading.Lock()
+
+    @classmethod
+    def _create_client(cls) -> requests.Session:
+        """Creates a requests session that keeps connections alive, 
+        pools enough connections for parallel transfers and retries gateway errors. 
+
+        Returns:
+            requests.Session: The configured session
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        client = requests.Session()
+        adapter = HTTPAdapter(pool_connections=cls.POOL_CONNECTIONS,
+                              pool_maxsize=cls.POOL_MAXSIZE,
+                              # the last gateway error is returned instead of raised, so callers 
+                              # see the response and handle it like any other failed status
+                              max_retries=Retry(total=3, backoff_factor=0.3,
+                                                status_forcelist=[502, 503, 504],
+                                                raise_on_status=False))
+        client.mount("https://", adapter)
+        client.headers.update({"User-Agent": cls.USER_AGENT, "Connection": "keep-alive"})
+        return client
 
     @staticmethod
     def with_user_auth(email: str, password: str) -> GaudeamSession:
@@ -40,31 +119,50 @@ class GaudeamSession():
         Returns:
             GaudeamSession: The session to Gaudeam
         """
-        temp_session = requests.Session()
+        temp_session = GaudeamSession._create_client()
         url_login = "https://auth.gaudeam.de/login"
-        response_login_page = temp_session.get(url_login)
-        soup = BeautifulSoup(response_login_page.content, "html.parser")
-        authenticity_token = soup.find("input", {"name": "authenticity_token"})["value"]
-        data = {
-            "authenticity_token": authenticity_token,
-            "user[email]": email,
-            "user[password]": password,
-            "user[remember_me]": [
-                "0",
-                "1"
-            ],
-            "user[anchor_after_login]": "",
-            "commit": "Einloggen"
-        }
-
-        response_auth = temp_session.post(url_login, data, allow_redirects=False)
+        # the token is in the login form near the top, so the page is only scanned until it is found
+        match = None
+        with temp_session.get(url_login, stream=True) as response_login_page:
+            buffer = bytearray()
+            chunks = response_login_page.iter_content(chunk_size=GaudeamSession.LOGIN_PAGE_CHUNK_SIZE)
+            for chunk in chunks:
+                buffer += chunk
+                match = _AUTH_TOKEN_RE.search(buffer)
+                if match is not None:
+                    break
+            # the rest of the page is read without scanning, closing a partly read response 
+            # would drop the connection instead of reusing it for the login POST
+            for _ in chunks:
+                pass
+        if match is None:
+            raise IgiturError("Could not find the authenticity token on the login page")
+        authenticity_token = html.unescape((match.group(1) or match.group(2)).decode("utf-8"))
+        # the form is encoded explicitly, remember_me is sent twice like the browser does
+        body = urlencode([
+            ("authenticity_token", authenticity_token),
+            ("user[email]", email),
+            ("user[password]", password),
+            ("user[remember_me]", "0"),
+            ("user[remember_me]", "1"),
+            ("user[anchor_after_login]", ""),
+            ("commit", "Einloggen")
+        ]).encode("ascii")
+
+        response_auth = temp_session.post(url_login, data=body,
+                                          headers={"Content-Type": "application/x-www-form-urlencoded"},
+                                          allow_redirects=False)
         status = response_auth.status_code
         if status == 302: # redirect, login successful
-            redirect_url = response_auth.headers.get("Location")
-            subdomain = redirect_url.removeprefix("https://").split(".gaudeam.de")[0]
+            match = _SUBDOMAIN_RE.match(response_auth.headers.get("Location", ""))
+            if match is None:
+                raise IgiturAuthenticationError("Login redirected to an unexpected location")
+            subdomain = match.group(1)
             session_cookie = response_auth.cookies["_gaudeam_session"]
 
-            return GaudeamSession(session_cookie, subdomain)
+            # keep the client of the login with its adapters and pool, only the session cookie is needed from the login
+            temp_session.cookies.clear()
+            return GaudeamSession(session_cookie, subdomain, client=temp_session)
         else:
             raise IgiturAuthenticationError("Failed to login to gaudeam, check credentials")
 
@@ -77,65 +175,197 @@ class GaudeamSession():
         """
         return self._client
 
+    def close(self) -> None:
+        """Closes the pooled connections of the session. The session can still be used afterwards, 
+        new connections are opened as needed. 
+        """
+        self._client.close()
+
+    def __enter__(self) -> GaudeamSession:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
     def url(self) -> str:
         """Returns the base url, e.g. "https://yourinstance.gaudeam.de"
 
         Returns:
             str: the base url of your instance
         """
-        return f"https://{self._subdomain}.gaudeam.de"
+        return self._base_url
+
+    def cached_get_json(self, url: str, params: dict|None = None) -> tuple[int, typing.Any]:
+        """GET request for JSON whose successful answers are remembered for GET_CACHE_TTL seconds, 
+        so objects that are created several times do not fetch the same data again. 
+        Answers with "Cache-Control: no-store" are not remembered. 
+
+        Args:
+            url (str): The url to get
+            params (dict | None, optional): Query parameters. Defaults to None.
+
+        Returns:
+            tuple[int, typing.Any]: The status code and the decoded body if the status is 200, 
+                                    otherwise the status code and the text of the response
+        """
+        key = (url, frozenset((params or {}).items()))
+        now = time.monotonic()
+        with self._get_cache_lock:
+            cached = self._get_cache.get(key)
+        if cached is not None and now < cached[0]:
+            return 200, cached[1]
+        response = self.client().get(url, params=params)
+        if response.status_code != 200:
+            return response.status_code, response.text
+        data = response_json(response)
+        if "no-store" not in response.headers.get("Cache-Control", ""):
+            with self._get_cache_lock:
+                self._get_cache.pop(key, None)
+                if len(self._get_cache) >= self.GET_CACHE_MAX_ENTRIES:
+                    self._prune_get_cache(now)
+                self._get_cache[key] = (now + self.GET_CACHE_TTL, data)
+        return 200, data
+
+    def _prune_get_cache(self, now: float) -> None:
+        # expired entries are dropped, if none expired the oldest entry makes room
+        for key in [key for key, (expires, _) in self._get_cache.items() if expires <= now]:
+            del self._get_cache[key]
+        if len(self._get_cache) >= self.GET_CACHE_MAX_ENTRIES:
+            del self._get_cache[next(iter(self._get_cache))]
+
+    def invalidate(self, url_prefix: str = "") -> None:
+        """Forgets the answers remembered by cached_get_json for urls starting with the prefix. 
+
+        Args:
+            url_prefix (str, optional): Prefix of the urls to forget. Defaults to "", which forgets all.
+        """
+        with self._get_cache_lock:
+            for key in [key for key in self._get_cache if key[0].startswith(url_prefix)]:
+                del self._get_cache[key]
 
     def save_to_file(self, file_path: Path|str) -> None:
-        """Saves the session to a local file
+        """Saves the session to a local file. The file is only readable by the current user 
+        and is replaced atomically, so it is never left half written. 
 
         Args:
             file_path (Path | str): Path to the file to save the session to
         """
         file_path = Path(file_path)
-        with open(file_path, "w") as f:
-            json.dump({
-                "gaudeam_session_cookie": self._gaudeam_session,
-                "subdomain": self._subdomain
-            }, f)
+        # mkstemp creates the file with mode 0600
+        fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=f"{file_path.name}.", suffix=".tmp")
+        try:
+            # the payload is tiny, so it is written to the raw descriptor without the buffered io stack
+            try:
+                os.write(fd, json_dumps({
+                    "gaudeam_session_cookie": self._gaudeam_session,
+                    "subdomain": self._subdomain
+                }, append_newline=True))
+            finally:
+                os.close(fd)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
 
     @staticmethod
-    def from_file(file_path: Path|str) -> GaudeamSession:
-        """Loads a gaudeam session from a local file
+    def from_file(file_path: Path|str, *, validate: bool = True) -> GaudeamSession:
+        """Loads a gaudeam session from a local file. 
+        Loading the same unchanged file again returns the already loaded session. 
 
         Args:
             file_path (Path | str): Path to the file to load the session from
+            validate (bool, optional): Check that the session is still valid before returning it. 
+                                    Without the check the caller has to handle an expired session 
+                                    in its own requests, e.g. with is_valid. Defaults to True.
+
+        Raises:
+            IgiturAuthenticationError: If validate is set and the session is not valid anymore
+
         Returns:
             GaudeamSession: The loaded session
         """
-        file_path = Path(file_path)
-        with open(file_path, "r") as f:
-            data = json.load(f)
-            session = GaudeamSession(
-                gaudeam_session_cookie=data["gaudeam_session_cookie"],
-                subdomain=data["subdomain"]
-            )
-        if session.is_valid():
+        file_path = Path(file_path).resolve()
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            # one fstat gives the file identity for the cache check and the size for the read
+            stat = os.fstat(fd)
+            file_identity = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            # reuse the session if the file did not change since it was loaded last time
+            cached = _loaded_sessions.get(file_path)
+            if cached is not None and cached[0] == file_identity:
+                session = cached[1]
+            else:
+                data = json_loads(os.read(fd, stat.st_size))
+                session = GaudeamSession(
+                    gaudeam_session_cookie=data["gaudeam_session_cookie"],
+                    subdomain=data["subdomain"]
+                )
+                _loaded_sessions[file_path] = (file_identity, session)
+        finally:
+            os.close(fd)
+        if not validate or session.is_valid():
             return session
         else:
             raise IgiturAuthenticationError("Loaded session is not valid anymore, Please log in again.")
 
+    def _fetch_current_member(self, max_age: float = VALIDATION_CACHE_TTL) -> dict | None:
+        """Gets the logged in member, reusing the last successful answer if it is younger than max_age. 
+        Failed requests are not cached. 
+
+        Args:
+            max_age (float, optional): Maximum age of a cached answer in seconds. 
+
+        Returns:
+            dict | None: The current member or None if the session is not valid
+        """
+        if self._current_member_cache is not None \
+                and time.monotonic() - self._current_member_cache_ts < max_age:
+            return self._current_member_cache
+        response = self._client.get(self._current_member_url)
+        if response.status_code != 200:
+            return None
+        self._current_member_cache = response_json(response)
+        self._current_member_cache_ts = time.monotonic()
+        self._valid_until = self._current_member_cache_ts + self.VALIDATION_CACHE_TTL
+        return self._current_member_cache
+
     def is_valid(self) -> bool:
-        """Checks if the session is still valid by making a test request
+        """Checks if the session is still valid by making a test request. 
+        The check uses HEAD so no body is transferred, and falls back to GET if the server does not allow HEAD. 
+        A successful check is cached for VALIDATION_CACHE_TTL seconds, failed checks are not cached. 
 
         Returns:
             bool: True if the session is valid
         """
-        url = f"{self.url()}/api/v1/current_member"
-        response = self.client().get(url)
-        return response.status_code == 200
+        if time.monotonic() < self._valid_until:
+            return True
+        if self._head_supported:
+            response = self._client.head(self._current_member_url, allow_redirects=False)
+            if response.status_code != 405:
+                valid = response.status_code == 200
+                if valid:
+                    self._valid_until = time.monotonic() + self.VALIDATION_CACHE_TTL
+                return valid
+            self._head_supported = False
+        return self._fetch_current_member() is not None
+
+    def invalidate_cache(self) -> None:
+        """Forgets the cached result of is_valid, the next check will ask the server again
+        """
+        self._valid_until = 0.0
+        self._current_member_cache = None
+        self._current_member_cache_ts = 0.0
 
     def get_user_email(self) -> str:
         """Gets the email of the logged in user
 
+        Raises:
+            IgiturAuthenticationError: If the session is not valid
+
         Returns:
             str: Email of the logged in user
         """
-        url = f"{self.url()}/api/v1/current_member"
-        response = self.client().get(url)
-        data = response.json()
+        data = self._fetch_current_member()
+        if data is None:
+            raise IgiturAuthenticationError("Session is not valid anymore, Please log in again.")
         return data["personal_record"]["email"]
@@ -0,0 +1,79 @@
+import io
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from igitur.drive import GaudeamDriveFile, GaudeamDriveFolder, _StreamingMultipartBody
+
+
+class _FakeResponse:
+
+    def __init__(self, content: bytes):
+        self.status_code = 200
+        self.headers = {"Content-Length": str(len(content))}
+        self._content = content
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def iter_content(self, chunk_size: int):
+        # slow enough that two downloads of the same file would overlap
+        for i in range(0, len(self._content), 2):
+            time.sleep(0.01)
+            yield self._content[i:i + 2]
+
+
+class _FakeSession:
+
+    def __init__(self):
+        self.downloads = []
+        self._lock = threading.Lock()
+
+    def url(self) -> str:
+        return "https://test.gaudeam.de"
+
+    def client(self):
+        return self
+
+    def get(self, url: str, headers=None, stream=False):
+        with self._lock:
+            self.downloads.append(url)
+        return _FakeResponse(url.encode("utf-8"))
+
+
+class StreamingMultipartBodyTest(unittest.TestCase):
+
+    def test_non_string_fields_are_sent_as_text(self):
+        body = _StreamingMultipartBody({"key": "uploads/a.jpg", "success_action_status": 201},
+                                       "file", "a.jpg", io.BytesIO(b"jpeg"))
+        data = body.read()
+        self.assertEqual(len(data), len(body))
+        self.assertIn(b'name="success_action_status"\r\n\r\n201\r\n', data)
+        self.assertIn(b'name="key"\r\n\r\nuploads/a.jpg\r\n', data)
+        self.assertNotIn(b"\x00", data)
+        self.assertTrue(data.endswith(b"jpeg" + b"\r\n--" + body.content_type.split("boundary=")[1].encode() + b"--\r\n"))
+
+
+class DownloadTest(unittest.TestCase):
+
+    def test_files_with_the_same_name_are_downloaded_once(self):
+        session = _FakeSession()
+        folder = GaudeamDriveFolder(session, "1", properties={"name": "root"})
+        files = [GaudeamDriveFile(session, file_id, properties={"name": "IMG", "download_name": "IMG.jpg"}, parent=folder)
+                 for file_id in ("1", "2")]
+        folder.iter_contents = lambda: iter(files)
+
+        with tempfile.TemporaryDirectory() as destination:
+            self.assertTrue(folder.download(destination, max_workers=2))
+            self.assertEqual(len(session.downloads), 1)
+            self.assertEqual(sorted(path.name for path in Path(destination).iterdir()), ["IMG.jpg"])
+            self.assertEqual((Path(destination) / "IMG.jpg").read_bytes(), session.downloads[0].encode("utf-8"))
+
+
+if __name__ == "__main__":
+    unittest.main()